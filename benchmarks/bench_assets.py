@@ -0,0 +1,88 @@
+"""Compare per-worker memory with private and shared decoded assets.
+
+Run with ``python benchmarks/bench_assets.py [--workers 4]``. Each spawned
+worker builds a :class:`VisualNovel`, loads its images either from disk (every
+worker decodes its own copy) or from :class:`SharedAssets` published once by
+this script, then renders every screen at every location so all assets are
+actually decoded and touched. Workers report RSS, PSS and private memory
+before loading and after rendering.
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from visual_novel_chat.assets import SharedAssets, memory_usage  # noqa: E402
+
+LOCATIONS = ["bridge", "swing", "grove", "path"]
+MOODS = ["love", "joy", "anger", "surprise", "sadness", "fear"]
+
+
+def worker(manifest, output_dir, barrier, results) -> None:
+    from visual_novel_chat.visual_novel import VisualNovel
+
+    visual_novel = VisualNovel({"BOT-NAME": "Gwen"}, assets_root=ROOT)
+    visual_novel.output_dir = Path(output_dir)
+    before = memory_usage()
+    assets = SharedAssets.attach(manifest) if manifest is not None else None
+    visual_novel.load_images(assets)
+    for location in LOCATIONS:
+        for mood in MOODS:
+            visual_novel.current_location = location
+            visual_novel.waifu_mood = mood
+            visual_novel.update_waifu_stats()
+            for overlay in ("chat", "menu", "map", "about"):
+                visual_novel._prepare_screen(overlay)
+    after = memory_usage()
+    results.put((before, after))
+    # Keep every worker alive until all have measured, so PSS splits shared
+    # pages between all of them.
+    barrier.wait()
+
+
+def run(workers: int, shared: bool) -> None:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    barrier = context.Barrier(workers)
+    assets = SharedAssets.publish(ROOT) if shared else None
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            processes = [
+                context.Process(target=worker, args=(assets.manifest if assets else None, tmp, barrier, results))
+                for _ in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            samples = [results.get(timeout=120) for _ in processes]
+            for process in processes:
+                process.join()
+    finally:
+        if assets is not None:
+            assets.close()
+
+    label = f"shared ({assets.manifest.size / 2**20:.1f} MiB published)" if assets else "private"
+    print(f"{label}, {workers} workers")
+    for name in samples[0][1]:
+        before = statistics.mean(sample[0].get(name, 0) for sample in samples) / 2**20
+        after = statistics.mean(sample[1][name] for sample in samples) / 2**20
+        print(f"  {name:>7}: {before:6.1f} MiB before -> {after:6.1f} MiB after (+{after - before:.1f}) per worker")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    run(args.workers, shared=False)
+    run(args.workers, shared=True)
+
+
+if __name__ == "__main__":
+    main()
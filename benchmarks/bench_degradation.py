@@ -0,0 +1,139 @@
+"""Drive ``!gwen``-shaped requests past capacity with and without degradation.
+
+Run with ``python benchmarks/bench_degradation.py``. Requests arrive on a
+fixed Poisson schedule; each one waits for a simulated model call in the
+:class:`FairScheduler`, then runs the emotion classifier (simulated by
+blocking the event loop for ``--classify-ms``, roughly the CPU cost of the
+transformer) and renders a real frame on the event loop, as the bot does.
+Latency is measured from the scheduled arrival time, so time spent waiting
+for a blocked loop counts. The script prints p50/p99 latency and the tiers
+used, first with quality fixed at full and then with
+:class:`DegradationController` choosing the tier.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from visual_novel_chat.degradation import (  # noqa: E402
+    FULL,
+    REDUCED_FRAME,
+    REUSE_MOOD,
+    TEXT_ONLY,
+    TIER_NAMES,
+    DegradationController,
+)
+from visual_novel_chat.scheduler import FairScheduler  # noqa: E402
+from visual_novel_chat.visual_novel import VisualNovel  # noqa: E402
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+REPLY = "Of course! The bridge is quiet tonight, so we can talk as long as you like. What is on your mind?"
+
+
+def fake_model(service_time: float) -> str:
+    time.sleep(service_time)
+    return REPLY
+
+
+def classify(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def run(
+    args: argparse.Namespace,
+    novel: VisualNovel,
+    rate: float,
+    controller: Optional[DegradationController],
+) -> None:
+    scheduler = FairScheduler(
+        workers=args.workers,
+        max_queue=10_000,
+        max_queue_per_guild=10_000,
+        user_rate=0,
+        user_burst=10_000,
+        guild_rate=0,
+        guild_burst=10_000,
+    )
+    monitor = asyncio.create_task(controller.monitor(0.05)) if controller else None
+    tiers: Counter = Counter()
+    latencies: List[float] = []
+    rng = random.Random(7)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    async def request(index: int, arrival: float) -> None:
+        await asyncio.sleep(max(arrival - loop.time(), 0))
+        response = await scheduler.submit("guild", f"user-{index % 50}", fake_model, args.service_time)
+        tier = controller.update(sum(scheduler.queue_depths().values())) if controller else FULL
+        tiers[TIER_NAMES[tier]] += 1
+        if tier < TEXT_ONLY:
+            if tier < REUSE_MOOD:
+                classify(args.classify_ms / 1000)
+            novel.prepare_chat_pages(response)
+            await novel.render_waifu_chat(reduced=tier >= REDUCED_FRAME)
+        latencies.append(loop.time() - arrival)
+
+    arrivals, clock = [], start
+    while clock < start + args.duration:
+        clock += rng.expovariate(rate)
+        arrivals.append(clock)
+    await asyncio.gather(*(request(index, arrival) for index, arrival in enumerate(arrivals)))
+    if monitor:
+        monitor.cancel()
+    await scheduler.close()
+
+    ordered = sorted(latencies)
+    p50 = ordered[len(ordered) // 2]
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    mix = ", ".join(f"{name} {tiers[name]}" for name in TIER_NAMES if tiers[name])
+    if controller:
+        mix += f"; {controller.metrics.transitions} transitions"
+    label = "degradation" if controller else "full quality"
+    print(
+        f"  {label:>12}: {len(latencies):4d} requests, p50 {p50 * 1000:7.0f} ms, "
+        f"p99 {p99 * 1000:7.0f} ms, max {ordered[-1] * 1000:7.0f} ms ({mix})"
+    )
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    logging.getLogger("visual_novel_chat").setLevel(logging.ERROR)
+    novel = VisualNovel({"BOT-NAME": "Gwen"}, assets_root=PROJECT_ROOT)
+    novel.load_images()
+    for rate in args.rates:
+        print(f"{rate:g} requests/s for {args.duration:g}s")
+        await run(args, novel, rate, None)
+        controller = DegradationController(
+            queue_thresholds=tuple(args.queue_depths),
+            lag_thresholds=tuple(lag / 1000 for lag in args.lag_ms),
+            cooldown=args.cooldown,
+        )
+        await run(args, novel, rate, controller)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rates", type=float, nargs="+", default=[5, 20, 40], help="arrival rates to test")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of arrivals per run")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent model calls")
+    parser.add_argument("--service-time", type=float, default=0.1, help="seconds per model call")
+    parser.add_argument("--classify-ms", type=float, default=30, help="simulated emotion model cost")
+    parser.add_argument("--queue-depths", type=int, nargs=3, default=[4, 8, 16])
+    parser.add_argument("--lag-ms", type=float, nargs=3, default=[100, 250, 500])
+    parser.add_argument("--cooldown", type=float, default=2)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
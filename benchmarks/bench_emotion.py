@@ -0,0 +1,114 @@
+"""Measure the emotion lexicon fast path against the transformer model.
+
+Run with ``python benchmarks/bench_emotion.py``. Each labelled reply below is
+classified by the lexicon and by :class:`EmotionClassifier`; the script prints
+how many replies the fast path answered, how often it agreed with the model,
+and the mean latency of both paths. ``--no-model`` skips the transformer and
+treats the labels as the model's answers, which works offline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from visual_novel_chat.lexicon import CascadeClassifier, evaluate  # noqa: E402
+
+SAMPLES = [
+    ("Yay, you came back! I'm so happy to see you, Senpai!", "joy"),
+    ("Haha, that was so much fun, let's do it again tomorrow!", "joy"),
+    ("I passed my exam! I'm so proud and relieved right now.", "joy"),
+    ("The festival was wonderful, thank you for taking me.", "joy"),
+    ("That sounds amazing, I'd be delighted to join you.", "joy"),
+    ("I'm really glad the weather is nice for our picnic.", "joy"),
+    ("We should celebrate with cake and tea at the grove!", "joy"),
+    ("I love spending time with you on the bridge.", "love"),
+    ("You're such a sweetheart, come here and give me a hug.", "love"),
+    ("I'll always cherish this moment with you, darling.", "love"),
+    ("My heart races whenever you smile at me like that... I adore you.", "love"),
+    ("Stay with me a little longer? I want to hold your hand.", "love"),
+    ("*blushes* You're making me all flustered, dear.", "love"),
+    ("I miss you so much when you're gone... it gets lonely here.", "sadness"),
+    ("I'm sorry, I didn't mean to hurt you. I feel terrible.", "sadness"),
+    ("My cat is sick and I can't stop crying.", "sadness"),
+    ("It's raining again and I feel so gloomy and tired.", "sadness"),
+    ("I was really disappointed that you forgot our date.", "sadness"),
+    ("Everyone left and now I'm all alone at the swing.", "sadness"),
+    ("Hmph! I'm so annoyed that you ignored my messages.", "anger"),
+    ("That's so unfair! You promised you'd come!", "anger"),
+    ("I hate it when people litter in the grove, it makes me furious.", "anger"),
+    ("Stop teasing me, you jerk!", "anger"),
+    ("Ugh, I'm really frustrated with my homework.", "anger"),
+    ("Don't you dare eat the last piece of cake.", "anger"),
+    ("I'm scared of the dark path at night, can you walk with me?", "fear"),
+    ("What was that noise?! Something is moving behind the trees...", "fear"),
+    ("I'm so nervous about the exam tomorrow.", "fear"),
+    ("That movie was terrifying, I'm still shaking.", "fear"),
+    ("I'm worried something bad happened to you.", "fear"),
+    ("Please don't leave me here, I have a bad feeling about this.", "fear"),
+    ("Wow, I didn't expect you to bring me flowers!", "surprise"),
+    ("Whoa, when did you get here? You startled me!", "surprise"),
+    ("Omg, is that a shooting star?!", "surprise"),
+    ("Wait, you've been here the whole time? I'm speechless.", "surprise"),
+    ("No way, you actually remembered my birthday?", "surprise"),
+    ("Huh? The bridge lanterns are already lit?", "surprise"),
+    ("The river is calm today. Shall we walk to the grove?", "joy"),
+    ("I made some tea, would you like a cup?", "love"),
+    ("Let me show you the map, we can go anywhere you like.", "joy"),
+    ("It's not that I'm happy you're here or anything!", "love"),
+    ("I'm not angry, just a little disappointed.", "sadness"),
+]
+
+
+class LabelModel:
+    """Stand-in for the transformer that returns the gold label."""
+
+    def __init__(self) -> None:
+        self.labels = dict(SAMPLES)
+
+    def predict(self, text: str):
+        return {"label": self.labels[text], "score": 1.0}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--no-model", action="store_true", help="use the labels instead of the transformer")
+    args = parser.parse_args()
+
+    if args.no_model:
+        model = LabelModel()
+    else:
+        from visual_novel_chat.ai import EmotionClassifier
+
+        model = EmotionClassifier()
+        model.predict("warm up")
+    cascade = CascadeClassifier(model)
+
+    fast, slow = [], []
+    for text, _ in SAMPLES:
+        started = time.perf_counter()
+        cascade.scorer.score(text)
+        fast.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        model.predict(text)
+        slow.append(time.perf_counter() - started)
+
+    report = evaluate(cascade, SAMPLES)
+    print(
+        f"{report['samples']} samples: fast path answered {report['fast_path_ratio']:.0%}, "
+        f"agreement with model {report['agreement']:.0%}, "
+        f"cascade accuracy {report['cascade_accuracy']:.0%} vs model {report['model_accuracy']:.0%}"
+    )
+    print(
+        f"mean latency: lexicon {statistics.mean(fast) * 1e6:.1f} us, "
+        f"{'labels' if args.no_model else 'model'} {statistics.mean(slow) * 1e3:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Compare frame encoding size and time for every screen VisualNovel renders.
+
+Run with ``python benchmarks/bench_encoding.py [--budget BYTES ...]``. Each
+screen (chat pages, menu positions, map and about overlays, at every
+location) is rendered once per budget. For each screen type the script
+prints the mean output size and encode time of :class:`FrameEncoder` next to
+the previous default ``Image.save("screen.jpg")`` baseline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from visual_novel_chat.encoding import FrameEncoder  # noqa: E402
+from visual_novel_chat.visual_novel import VisualNovel  # noqa: E402
+
+LOCATIONS = ["bridge", "swing", "grove", "path"]
+RESPONSE = (
+    "Welcome back, Senpai! The river is so calm today and the lanterns on the bridge "
+    "are just starting to glow. Do you want to walk to the grove with me later?"
+)
+
+
+class RecordingEncoder(FrameEncoder):
+    """FrameEncoder that also times the old default JPEG save for comparison."""
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.samples: Dict[str, List[Tuple[int, float, int, float, str]]] = defaultdict(list)
+
+    def encode(self, image, screen, output_stem):
+        started = time.perf_counter()
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, "JPEG")
+        baseline_seconds = time.perf_counter() - started
+        frame = super().encode(image, screen, output_stem)
+        self.samples[screen].append(
+            (len(buffer.getvalue()), baseline_seconds, frame.size, frame.seconds, frame.format)
+        )
+        return frame
+
+
+async def render_all_screens(visual_novel: VisualNovel) -> None:
+    for location in LOCATIONS:
+        visual_novel.current_location = location
+        visual_novel.update_waifu_stats()
+        await visual_novel.start()
+        visual_novel.prepare_chat_pages(RESPONSE)
+        for page in range(len(visual_novel.waifu_chat_pages)):
+            visual_novel.current_chat_page = page
+            visual_novel.waifu_chat = visual_novel.waifu_chat_pages[page]
+            await visual_novel.render_waifu_chat()
+        await visual_novel.render_chat(None)
+        for position in range(len(visual_novel.menu_texts)):
+            visual_novel.menu_position = position
+            await visual_novel.render_menu(None)
+        await visual_novel.render_map(None)
+        await visual_novel.render_about(None)
+
+
+async def no_update(interaction) -> None:
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=int, action="append", help="byte budget(s) to test")
+    args = parser.parse_args()
+
+    for budget in args.budget or [96_000, 64_000, 40_000]:
+        with tempfile.TemporaryDirectory() as tmp:
+            encoder = RecordingEncoder(byte_budget=budget)
+            visual_novel = VisualNovel({"BOT-NAME": "Gwen"}, assets_root=ROOT, encoder=encoder)
+            visual_novel.output_dir = Path(tmp)
+            visual_novel.load_images()
+            visual_novel._update_interaction = no_update
+            asyncio.run(render_all_screens(visual_novel))
+
+        print(f"budget {budget} bytes")
+        for screen, samples in sorted(encoder.samples.items()):
+            baseline_bytes, baseline_seconds, sizes, seconds, formats = zip(*samples)
+            print(
+                f"  {screen:>6}: {len(samples):3d} frames | baseline {statistics.mean(baseline_bytes) / 1024:7.1f} KiB "
+                f"{statistics.mean(baseline_seconds) * 1000:6.1f} ms | encoded {statistics.mean(sizes) / 1024:7.1f} KiB "
+                f"{statistics.mean(seconds) * 1000:6.1f} ms as {'/'.join(sorted(set(formats)))}, "
+                f"{sum(size > budget for size in sizes)} over budget"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Measure logging overhead on the text and history hot paths.
+
+Run with ``python benchmarks/bench_logging.py``. The same workload is timed
+under three logging setups:
+
+* ``sync-debug``: the previous ``logging.basicConfig(level=DEBUG)`` style,
+  formatting and writing every record on the calling thread.
+* ``queue-debug-sampled``: :func:`configure_logging` at DEBUG with 1% of
+  requests sampled and records handed to a background listener.
+* ``queue-info``: :func:`configure_logging` at the production INFO level,
+  where the level guards skip argument formatting entirely.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from visual_novel_chat.database import ConversationHistory  # noqa: E402
+from visual_novel_chat.log import configure_logging, request_context  # noqa: E402
+from visual_novel_chat.text_utils import paginate_text, wrap_text  # noqa: E402
+
+RESPONSE = "Gwen smiles and points at the bridge over the quiet river. " * 6
+
+
+def history_workload(history: ConversationHistory, iterations: int) -> float:
+    started = time.perf_counter()
+    for index in range(iterations):
+        with request_context("bench"):
+            history.add_message("bench-user", "user", f"question {index}")
+            history.get_conversation("bench-user")
+            history.prune_conversation("bench-user")
+    return time.perf_counter() - started
+
+
+def text_workload(iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        with request_context("bench"):
+            for _ in range(10):
+                paginate_text(wrap_text(RESPONSE))
+    return time.perf_counter() - started
+
+
+def setup(name: str, sink):
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    if name == "sync-debug":
+        logging.basicConfig(level=logging.DEBUG, stream=sink, force=True)
+        return None
+    if name == "queue-debug-sampled":
+        return configure_logging(logging.DEBUG, sample_rate=0.01, stream=sink)
+    return configure_logging(logging.INFO, stream=sink)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as sink:
+        for name in ("sync-debug", "queue-debug-sampled", "queue-info"):
+            history = ConversationHistory(Path(tmp) / f"{name}.db")
+            listener = setup(name, sink)
+            history_elapsed = history_workload(history, args.iterations)
+            text_elapsed = text_workload(args.iterations)
+            if listener is not None:
+                listener.stop()
+            print(
+                f"{name:>20}: history {history_elapsed * 1e6 / args.iterations:8.1f} us/request, "
+                f"text {text_elapsed * 1e6 / args.iterations:7.1f} us/request"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Compare prompt evaluation work for the stable and the previous prompt layout.
+
+Run with ``python benchmarks/bench_prompt_cache.py [--turns 60]``. A single
+user holds a long conversation with :class:`AiResponder`. By default the model
+is simulated: like Ollama, it keeps the tokens of the previous prompt and
+reply and only evaluates the part of the new prompt after the longest common
+prefix (words stand in for tokens). ``--ollama`` talks to a local Ollama
+server instead and reports its ``prompt_eval_count`` and
+``prompt_eval_duration``.
+
+The previous layout is reproduced by a subclass: the scene block and recalled
+memories are placed in front of the new user message and the window slides
+one message at a time.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from visual_novel_chat.ai import AiResponder  # noqa: E402
+from visual_novel_chat.database import ConversationHistory  # noqa: E402
+
+LOCATIONS = ["bridge", "swing", "grove", "path"]
+TOPICS = ["tulips", "the festival", "my exam", "the river", "tea", "the lanterns", "our picnic", "the rain"]
+
+
+class LegacyResponder(AiResponder):
+    """The layout before prompts were made append-only."""
+
+    @staticmethod
+    def _build_messages(conversation: List[Any], memory: Optional[dict], state: Optional[dict]) -> List[dict]:
+        messages = [dict(msg.__dict__) for msg in conversation]
+        if state is not None:
+            messages[-1]["content"] = state["content"] + messages[-1]["content"]
+        if memory is not None:
+            messages.insert(len(messages) - 1, memory)
+        return messages
+
+
+class PrefixCachingModel:
+    """Mimic a single Ollama slot that reuses the longest common prompt prefix."""
+
+    def __init__(self) -> None:
+        self.cached: List[str] = []
+
+    def __call__(self, model: str, messages: List[dict], **kwargs: Any) -> dict:
+        tokens = [word for message in messages for word in f"<{message['role']}> {message['content']}".split()]
+        shared = 0
+        for cached, token in zip(self.cached, tokens):
+            if cached != token:
+                break
+            shared += 1
+        reply = f"I remember {TOPICS[len(tokens) % len(TOPICS)]}, it was lovely at the {LOCATIONS[shared % 4]}."
+        self.cached = tokens + ["<assistant>", *reply.split()]
+        evaluated = len(tokens) - shared
+        return {
+            "message": {"content": reply},
+            "prompt_eval_count": evaluated,
+            "prompt_eval_duration": evaluated * 1_000_000,
+        }
+
+
+def run(responder_class: type, turns: int, chat_callable: Any, keep_alive: Optional[str], window: int, chunk: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        history = ConversationHistory(Path(tmp) / "bench.db")
+        responder = responder_class(
+            history,
+            chat_callable=chat_callable,
+            keep_alive=keep_alive,
+            max_messages=window,
+            prune_chunk=1 if responder_class is LegacyResponder else chunk,
+        )
+        for turn in range(turns):
+            prompt = f"Do you still think about {TOPICS[turn % len(TOPICS)]}? Tell me more, please."
+            location = LOCATIONS[(turn // 5) % len(LOCATIONS)]
+            responder.query(prompt, "bench-user", "Ann", {}, location=location)
+        return responder.metrics
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--ollama", action="store_true", help="use a local Ollama server")
+    parser.add_argument("--keep-alive", default="30m")
+    parser.add_argument("--window", type=int, default=9, help="messages kept in the prompt")
+    parser.add_argument("--chunk", type=int, default=4, help="messages pruned at once by the stable layout")
+    args = parser.parse_args()
+
+    for name, responder_class in (("previous layout", LegacyResponder), ("stable layout", AiResponder)):
+        chat_callable = None if args.ollama else PrefixCachingModel()
+        metrics = run(responder_class, args.turns, chat_callable, args.keep_alive, args.window, args.chunk)
+        requests = metrics["prompt_requests"]
+        print(
+            f"{name:>15}: {metrics['prompt_eval_count'] / requests:7.1f} prompt tokens evaluated per turn, "
+            f"{metrics['prompt_eval_seconds'] / requests * 1e3:7.1f} ms prompt eval per turn"
+            + ("" if args.ollama else " (simulated at 1 ms/token)")
+        )
+
+
+if __name__ == "__main__":
+    main()
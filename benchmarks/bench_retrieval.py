@@ -0,0 +1,95 @@
+"""Measure archive retrieval latency on a large conversation archive.
+
+Run with ``python benchmarks/bench_retrieval.py [--rows 1000000]``. The
+script fills ``conversation_archive`` with synthetic messages spread across
+many users (the FTS5 index is maintained by the insert trigger, as in
+production) and then times :meth:`ConversationHistory.search_archive` for
+random users and prompts. Messages mix common words with a Zipf-distributed
+vocabulary, which roughly matches how chat text is distributed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from visual_novel_chat.database import ConversationHistory  # noqa: E402
+
+COMMON = "i you the and to a it is that of me my we so do what".split()
+TOPICS = (
+    "bridge swing grove path river lantern tea cake flower tulip rose cat dog rain sun moon star "
+    "song dance book movie game school exam friend sister brother train beach winter summer "
+    "festival fireworks picnic coffee ramen sushi homework dream secret gift letter umbrella"
+).split()
+VOCABULARY = TOPICS + [f"{topic}{suffix}" for suffix in range(100) for topic in TOPICS]
+CUMULATIVE_WEIGHTS = list(itertools.accumulate(1 / rank for rank in range(1, len(VOCABULARY) + 1)))
+
+
+def sentence(rng: random.Random, topical: int = 4, common: int = 8) -> str:
+    words = rng.choices(VOCABULARY, cum_weights=CUMULATIVE_WEIGHTS, k=topical) + rng.choices(COMMON, k=common)
+    rng.shuffle(words)
+    return " ".join(words)
+
+
+def populate(history: ConversationHistory, rows: int, users: int, batch: int = 50_000) -> float:
+    rng = random.Random(7)
+    started = time.perf_counter()
+    with history._connect() as conn:
+        for offset in range(0, rows, batch):
+            conn.executemany(
+                "INSERT INTO conversation_archive (id, user_id, role, content) VALUES (?, ?, ?, ?)",
+                (
+                    (
+                        row_id,
+                        f"user-{row_id % users}",
+                        "user" if row_id % 2 else "assistant",
+                        sentence(rng),
+                    )
+                    for row_id in range(offset + 1, min(offset + batch, rows) + 1)
+                ),
+            )
+            conn.commit()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--limit", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = ConversationHistory(Path(tmp) / "bench.db")
+        elapsed = populate(history, args.rows, args.users)
+        print(f"archived {args.rows} rows in {elapsed:.1f}s ({args.rows / elapsed:,.0f} rows/s incl. FTS)")
+
+        rng = random.Random(11)
+        latencies = []
+        hits = 0
+        for _ in range(args.queries):
+            user = f"user-{rng.randrange(args.users)}"
+            prompt = "Do you remember the " + " and the ".join(rng.choices(VOCABULARY, cum_weights=CUMULATIVE_WEIGHTS, k=2)) + "?"
+            started = time.perf_counter()
+            results = history.search_archive(user, prompt, args.limit)
+            latencies.append(time.perf_counter() - started)
+            hits += bool(results)
+
+        latencies.sort()
+        print(
+            f"search_archive over {args.queries} queries: median {statistics.median(latencies) * 1e3:.3f} ms, "
+            f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.3f} ms, hit rate {hits / args.queries:.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Simulate a noisy guild competing with quiet guilds for a single model.
+
+Run with ``python benchmarks/bench_scheduler.py``. One guild floods the bot
+with requests while a few quiet guilds send a handful each, all against a
+model that serves one request at a time. The script prints per-guild latency
+for plain FIFO ordering and for :class:`FairScheduler`, plus the scheduler's
+queue depth and rejection counters.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from visual_novel_chat.scheduler import FairScheduler, SchedulerBusy  # noqa: E402
+
+Submit = Callable[[str, str], Awaitable[float]]
+
+
+def fake_model(service_time: float) -> float:
+    time.sleep(service_time)
+    return service_time
+
+
+async def run_workload(submit: Submit, noisy: int, quiet_guilds: int, quiet: int) -> Dict[str, List[float]]:
+    latencies: Dict[str, List[float]] = {}
+
+    async def request(guild: str, user: str) -> None:
+        started = time.perf_counter()
+        try:
+            await submit(guild, user)
+        except SchedulerBusy:
+            latencies.setdefault(f"{guild} (rejected)", []).append(0.0)
+            return
+        latencies.setdefault(guild, []).append(time.perf_counter() - started)
+
+    tasks = [asyncio.create_task(request("noisy", f"raider-{i % 5}")) for i in range(noisy)]
+    await asyncio.sleep(0)
+    for guild in range(quiet_guilds):
+        tasks += [asyncio.create_task(request(f"quiet-{guild}", f"user-{i}")) for i in range(quiet)]
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+def report(title: str, latencies: Dict[str, List[float]]) -> None:
+    print(title)
+    for guild, values in sorted(latencies.items()):
+        if guild.endswith("(rejected)"):
+            print(f"  {guild:>18}: {len(values):4d} requests")
+            continue
+        ordered = sorted(values)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        print(
+            f"  {guild:>18}: {len(values):4d} served, mean {statistics.mean(values) * 1000:7.1f} ms, "
+            f"p95 {p95 * 1000:7.1f} ms"
+        )
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    lock = asyncio.Semaphore(1)
+
+    async def fifo_submit(guild: str, user: str) -> float:
+        async with lock:
+            return await asyncio.to_thread(fake_model, args.service_time)
+
+    report("FIFO", await run_workload(fifo_submit, args.noisy, args.quiet_guilds, args.quiet))
+
+    scheduler = FairScheduler(
+        workers=1,
+        max_queue=args.max_queue,
+        max_queue_per_guild=args.max_guild_queue,
+        user_rate=0,
+        user_burst=args.noisy,
+        guild_rate=0,
+        guild_burst=args.noisy,
+    )
+
+    async def fair_submit(guild: str, user: str) -> float:
+        return await scheduler.submit(guild, user, fake_model, args.service_time)
+
+    report("FairScheduler", await run_workload(fair_submit, args.noisy, args.quiet_guilds, args.quiet))
+    metrics = scheduler.metrics
+    print(
+        f"  max queue depth {metrics.max_queue_depth}, queue full rejections {metrics.queue_full}, "
+        f"mean wait {metrics.total_wait / max(metrics.completed, 1) * 1000:.1f} ms"
+    )
+    await scheduler.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--noisy", type=int, default=60, help="requests sent by the noisy guild")
+    parser.add_argument("--quiet-guilds", type=int, default=3)
+    parser.add_argument("--quiet", type=int, default=3, help="requests sent by each quiet guild")
+    parser.add_argument("--service-time", type=float, default=0.01, help="seconds per model call")
+    parser.add_argument("--max-queue", type=int, default=32)
+    parser.add_argument("--max-guild-queue", type=int, default=8)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
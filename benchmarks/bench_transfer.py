@@ -0,0 +1,86 @@
+"""Measure JSONL export and import throughput on a large history database.
+
+Run with ``python benchmarks/bench_transfer.py [--rows 2000000]``. The script
+fills a database with live conversation rows plus ``--archived`` archive rows
+(which also feed the FTS5 index), exports everything to plain and gzipped
+JSONL, and imports each file into an empty database. Resident memory is
+sampled around each step to show that it stays flat regardless of size.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from visual_novel_chat.assets import memory_usage  # noqa: E402
+from visual_novel_chat.database import ConversationHistory  # noqa: E402
+from visual_novel_chat.transfer import export_jsonl, import_jsonl  # noqa: E402
+
+WORDS = "i you the and to it is that me my we so what bridge river tea cake rain moon song school friend".split()
+
+
+def populate(history: ConversationHistory, rows: int, archived: int, users: int, batch: int = 100_000) -> None:
+    rng = random.Random(5)
+    with history._connect() as conn:
+        for table, count in (("conversation", rows), ("conversation_archive", archived)):
+            for offset in range(0, count, batch):
+                conn.executemany(
+                    f"INSERT INTO {table} (user_id, role, content, timestamp) VALUES (?, ?, ?, '2024-05-01 12:00:00')",
+                    (
+                        (f"user-{index % users}", "user" if index % 2 else "assistant", " ".join(rng.choices(WORDS, k=12)))
+                        for index in range(offset, min(offset + batch, count))
+                    ),
+                )
+                conn.commit()
+
+
+def rss() -> int:
+    usage = memory_usage()
+    return usage.get("rss", usage.get("maxrss", 0))
+
+
+def timed(label: str, count_rows, *args) -> None:
+    before = rss()
+    started = time.perf_counter()
+    count = count_rows(*args)
+    elapsed = time.perf_counter() - started
+    after = rss()
+    print(
+        f"  {label:<28} {count:>9} rows in {elapsed:6.1f}s ({count / elapsed:>9,.0f} rows/s), "
+        f"RSS {before / 2**20:.0f} -> {after / 2**20:.0f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000, help="live conversation rows")
+    parser.add_argument("--archived", type=int, default=500_000, help="archived rows")
+    parser.add_argument("--users", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        source = ConversationHistory(root / "source.db")
+        started = time.perf_counter()
+        populate(source, args.rows, args.archived, args.users)
+        print(f"populated {args.rows + args.archived} rows in {time.perf_counter() - started:.1f}s")
+
+        for name in ("history.jsonl", "history.jsonl.gz"):
+            path = root / name
+            timed(f"export {name}", export_jsonl, source, path)
+            print(f"  {name} is {path.stat().st_size / 2**20:.1f} MiB")
+            timed(f"import {name}", import_jsonl, ConversationHistory(root / f"{name}.db"), path)
+
+        live = root / "conversation.jsonl"
+        timed("export live conversations", export_jsonl, source, live, ("conversation",))
+        timed("import live conversations", import_jsonl, ConversationHistory(root / "live.db"), live)
+        timed("export one user", export_jsonl, source, root / "user.jsonl", ("conversation", "archive"), ["user-7"])
+
+if __name__ == "__main__":
+    main()
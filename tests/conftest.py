@@ -1,7 +1,24 @@
 import sys
 from pathlib import Path
 
+import pytest
+
 # Ensure the project root is on sys.path for editable tests without installation.
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
+
+
+class FakeClock:
+    """Monotonic clock the test advances by assigning ``now``."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
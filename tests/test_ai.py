@@ -3,6 +3,7 @@ from dataclasses import dataclass
 import pytest
 
 from visual_novel_chat.ai import AiResponder, EmotionClassifier
+from visual_novel_chat.cache import ResponseCache
 from visual_novel_chat.database import ConversationHistory
 
 
@@ -51,3 +52,113 @@ def test_ai_responder_persists_conversation(tmp_path):
     conversation = history.get_conversation("user")
     assert conversation[0].role == "system"
     assert conversation[-1].role == "assistant"
+
+
+def test_ai_responder_serves_first_turns_from_cache(tmp_path):
+    history = ConversationHistory(tmp_path / "history.db")
+    calls = []
+
+    def fake_chat(model, messages):
+        calls.append(messages)
+        return {"message": {"content": "cached reply"}}
+
+    responder = AiResponder(history=history, chat_callable=fake_chat, cache=ResponseCache(ttl=60))
+    config = {"SYSTEM_PROMPT": "system"}
+    first = responder.query("hi", user_id="a", user_name="Ann", config=config, guild_id="g", location="bridge")
+    second = responder.query("hi", user_id="b", user_name="Bob", config=config, guild_id="g", location="bridge")
+    responder.query("hi", user_id="a", user_name="Ann", config=config, guild_id="g", location="bridge")
+
+    assert first == second == "cached reply"
+    assert len(calls) == 2
+    assert calls[0][-1]["content"] == "```gwen-data\n{'current-location': 'bridge'}\n```"
+    assert "Ann" not in str(calls[0]), "a shared first-turn reply must not depend on the user name"
+    assert "'current-user': 'Ann'" in calls[1][-1]["content"]
+    assert history.get_conversation("b")[-1].content == "cached reply"
+    assert responder.metrics["hits"] == 1
+
+
+def test_ai_responder_does_not_coalesce_named_turns_across_users(tmp_path):
+    import threading
+
+    history = ConversationHistory(tmp_path / "history.db")
+    for user in ("a", "b"):
+        history.add_message(user, "system", "system")
+        history.add_message(user, "user", "hello")
+        history.add_message(user, "assistant", "hi")
+    release = threading.Event()
+    calls = []
+
+    def fake_chat(model, messages):
+        calls.append(messages[-1]["content"])
+        if len(calls) == 2:
+            release.set()
+        release.wait(0.5)
+        return {"message": {"content": f"reply {len(calls)}"}}
+
+    responder = AiResponder(history=history, chat_callable=fake_chat, memory_snippets=0)
+    threads = [
+        threading.Thread(target=responder.query, args=("again", user, name, {}), kwargs={"location": "bridge"})
+        for user, name in (("a", "Ann"), ("b", "Bob"))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(calls) == sorted(
+        f"```gwen-data\n{{'current-location': 'bridge', 'current-user': '{name}'}}\n```" for name in ("Ann", "Bob")
+    )
+    assert responder.metrics["coalesced"] == 0
+
+
+def test_ai_responder_injects_recalled_memories(tmp_path):
+    history = ConversationHistory(tmp_path / "history.db")
+    history.add_message("user", "system", "system")
+    history.add_message("user", "user", "My favourite flower is the tulip")
+    for i in range(9):
+        history.add_message("user", "assistant", f"reply {i}")
+    history.prune_conversation("user")
+    seen = []
+
+    def fake_chat(model, messages):
+        seen.append(messages)
+        return "Tulips!"
+
+    responder = AiResponder(history=history, chat_callable=fake_chat)
+    responder.query("Which flower do I like?", user_id="user", user_name="Ann", config={})
+
+    assert seen[0][-2]["content"] == "Which flower do I like?"
+    memory = seen[0][-1]
+    assert memory["role"] == "system"
+    assert "- Ann: My favourite flower is the tulip" in memory["content"]
+    assert all("Earlier parts" not in m.content for m in history.get_conversation("user"))
+
+
+def test_ai_responder_keeps_prompt_prefix_stable(tmp_path):
+    history = ConversationHistory(tmp_path / "history.db")
+    seen = []
+
+    def fake_chat(model, messages, keep_alive):
+        seen.append([dict(message) for message in messages])
+        return {
+            "message": {"content": f"reply {len(seen)}"},
+            "prompt_eval_count": 10,
+            "prompt_eval_duration": 2_000_000,
+        }
+
+    responder = AiResponder(
+        history=history, chat_callable=fake_chat, memory_snippets=0, max_messages=9, prune_chunk=4, keep_alive="30m"
+    )
+    for turn in range(8):
+        responder.query(f"prompt {turn}", user_id="u", user_name="Ann", config={}, location="bridge")
+
+    for previous, current in zip(seen, seen[1:]):
+        state = previous.pop()
+        assert "'current-location': 'bridge'" in state["content"]
+        if current[1] == previous[1]:
+            assert current[: len(previous)] == previous
+    assert sum(current[1] != previous[1] for previous, current in zip(seen, seen[1:])) <= 2
+    assert all(message.content.startswith(("prompt", "reply")) for message in history.get_conversation("u")[1:])
+    assert responder.metrics["prompt_requests"] == 8
+    assert responder.metrics["prompt_eval_count"] == 80
+    assert responder.metrics["prompt_eval_seconds"] == pytest.approx(0.016)
@@ -0,0 +1,62 @@
+import multiprocessing
+import sys
+import zlib
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("PIL")
+
+from visual_novel_chat.assets import ASSET_FILES, SharedAssets, load_asset_images, memory_usage
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def checksum_worker(manifest, results):
+    with SharedAssets.attach(manifest) as assets:
+        images = assets.images()
+        results.put({key: (image.mode, image.size, zlib.crc32(image.tobytes())) for key, image in images.items()})
+        del images
+
+
+def test_workers_see_published_pixels(tmp_path):
+    disk = {key: image.convert("RGBA") for key, image in load_asset_images(ROOT).items()}
+    expected = {key: (image.mode, image.size, zlib.crc32(image.tobytes())) for key, image in disk.items()}
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    with SharedAssets.publish(ROOT) as assets:
+        assert set(assets.manifest.entries) == set(ASSET_FILES)
+        assert assets.manifest.entries["fear"] == assets.manifest.entries["surprise"]
+        worker = context.Process(target=checksum_worker, args=(assets.manifest, results))
+        worker.start()
+        observed = results.get(timeout=30)
+        worker.join(timeout=30)
+    assert worker.exitcode == 0
+    assert observed == expected
+
+
+def test_attached_images_are_zero_copy_views():
+    with SharedAssets.publish(ROOT, {"empty": ("ui_elements", "blank.png")}) as owner:
+        attached = SharedAssets.attach(owner.manifest)
+        image = attached.images()["empty"]
+        assert image.readonly
+        owner._shm.buf[0:4] = bytes([1, 2, 3, 4])
+        assert image.getpixel((0, 0)) == (1, 2, 3, 4)
+        del image
+        attached.close()
+
+
+def test_memory_usage_reports_rss():
+    usage = memory_usage()
+    assert usage.get("rss", usage.get("maxrss", 0)) > 0
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="needs the resource module")
+def test_memory_usage_falls_back_to_peak_rss(monkeypatch):
+    def no_smaps(*args, **kwargs):
+        raise OSError("no smaps_rollup")
+
+    monkeypatch.setattr("visual_novel_chat.assets.open", no_smaps, raising=False)
+    usage = memory_usage()
+    assert set(usage) == {"maxrss"}
+    assert usage["maxrss"] > 2**20, "ru_maxrss is scaled to bytes"
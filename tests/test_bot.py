@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("discord")
+
+from visual_novel_chat.ai import AiResponder, EmotionClassifier  # noqa: E402
+from visual_novel_chat.bot import EMPTY_REPLY, create_bot  # noqa: E402
+from visual_novel_chat.database import ConversationHistory  # noqa: E402
+from visual_novel_chat.degradation import DegradationController  # noqa: E402
+from visual_novel_chat.memory import MemoryAccountant  # noqa: E402
+from visual_novel_chat.scheduler import FairScheduler  # noqa: E402
+
+
+class FakeClassifier:
+    def predict(self, text):
+        return {"label": "joy", "score": 0.9}
+
+
+class FakeContext:
+    def __init__(self, user_id, content="!gwen hi", guild_id=1):
+        self.message = SimpleNamespace(author=SimpleNamespace(id=user_id, name=f"user{user_id}"), content=content)
+        self.guild = SimpleNamespace(id=guild_id)
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append((content, kwargs))
+
+
+class CountingAccountant(MemoryAccountant):
+    enforced = 0
+
+    def enforce(self):
+        self.enforced += 1
+        return super().enforce()
+
+
+def make_bot(tmp_path, chat, **kwargs):
+    history = ConversationHistory(tmp_path / "history.db")
+    responder = AiResponder(history=history, chat_callable=chat, memory_snippets=0)
+    kwargs.setdefault("scheduler", FairScheduler(workers=1))
+    kwargs.setdefault("classifier", FakeClassifier())
+    config = {"SYSTEM_PROMPT": "system", "BOT-NAME": "Gwen"}
+    bot = create_bot(config, history=history, responder=responder, **kwargs)
+    return bot, responder
+
+
+def reply(model, messages):
+    return {"message": {"content": "Hello there!"}}
+
+
+def test_repeated_gwen_requests_share_one_generation_through_the_scheduler(tmp_path):
+    calls = []
+    lock = threading.Lock()
+
+    def chat(model, messages):
+        with lock:
+            calls.append(messages)
+        time.sleep(0.2)
+        return {"message": {"content": "Hello there!"}}
+
+    scheduler = FairScheduler(workers=1, user_burst=1, guild_burst=3)
+    bot, _ = make_bot(tmp_path, chat, scheduler=scheduler)
+
+    async def scenario():
+        await bot.on_ready()
+        contexts = [FakeContext(1) for _ in range(6)]
+        await asyncio.gather(*(bot.get_command("gwen").callback(ctx) for ctx in contexts))
+        await scheduler.close()
+        return contexts
+
+    contexts = asyncio.run(scenario())
+    assert len(calls) == 1, "a user repeating a message costs one generation"
+    assert scheduler.metrics.coalesced == 5
+    assert scheduler.metrics.rate_limited == 0, "repeats take no tokens"
+    assert all(ctx.sent and "file" in ctx.sent[0][1] for ctx in contexts)
+
+
+def test_gwen_requests_from_different_users_are_each_admitted(tmp_path):
+    scheduler = FairScheduler(workers=1, user_burst=1, guild_burst=3)
+    bot, _ = make_bot(tmp_path, reply, scheduler=scheduler)
+
+    async def scenario():
+        await bot.on_ready()
+        contexts = [FakeContext(user_id) for user_id in range(6)]
+        await asyncio.gather(*(bot.get_command("gwen").callback(ctx) for ctx in contexts))
+        await scheduler.close()
+
+    asyncio.run(scenario())
+    assert scheduler.metrics.coalesced == 0
+    assert scheduler.metrics.submitted == 3
+    assert scheduler.metrics.rate_limited == 3, "the guild bucket limits a raid of new users"
+
+
+def test_plain_emotion_classifier_is_accounted_and_evictable(tmp_path):
+    accountant = MemoryAccountant()
+    make_bot(tmp_path, reply, classifier=EmotionClassifier(), accountant=accountant)
+    category = accountant.categories["emotion_model"]
+    assert category.evict is not None
+    assert category.size() == 0, "the model is not loaded yet"
+
+
+def test_memory_budget_is_enforced_on_text_only_replies_and_button_presses(tmp_path):
+    accountant = CountingAccountant()
+    degradation = DegradationController(queue_thresholds=(None, None, None), lag_thresholds=(None, None, None))
+    bot, _ = make_bot(tmp_path, reply, accountant=accountant, degradation=degradation)
+
+    class Interaction:
+        message = SimpleNamespace(id=1)
+        response = SimpleNamespace(is_done=lambda: True)
+
+        async def edit_original_response(self, **kwargs):
+            pass
+
+    async def scenario():
+        await bot.on_ready()
+        framed, text_only = FakeContext(1), FakeContext(2)
+        await bot.get_command("gwen").callback(framed)
+        assert accountant.enforced == 1
+        degradation.queue_thresholds = (None, None, 0)
+        await bot.get_command("gwen").callback(text_only)
+        assert accountant.enforced == 2
+        view = framed.sent[0][1]["view"]
+        button = next(item for item in view.children if item.callback.__name__ == "button_menu_callback")
+        await button.callback(Interaction())
+        return text_only
+
+    text_only = asyncio.run(scenario())
+    assert text_only.sent == [("Hello there!", {})]
+    assert accountant.enforced == 3
+
+
+def test_text_only_tier_replaces_an_empty_reply(tmp_path):
+    accountant = CountingAccountant()
+    text_only = DegradationController(queue_thresholds=(None, None, 0), lag_thresholds=(None, None, None))
+    bot, _ = make_bot(
+        tmp_path, lambda model, messages: {"message": {"content": "  "}}, accountant=accountant, degradation=text_only
+    )
+
+    async def scenario():
+        ctx = FakeContext(1)
+        await bot.get_command("gwen").callback(ctx)
+        return ctx
+
+    assert asyncio.run(scenario()).sent == [(EMPTY_REPLY, {})]
+    assert accountant.enforced == 1
@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from visual_novel_chat.cache import RequestCoalescer, ResponseCache
+
+
+def test_response_cache_expires_entries(clock):
+    cache = ResponseCache(ttl=10, clock=clock)
+    key = ("system", "bridge", "hello")
+    cache.put("guild", key, "hi!")
+
+    assert cache.get("guild", key) == "hi!"
+    assert cache.get("other-guild", key) is None
+    clock.now = 11
+    assert cache.get("guild", key) is None
+    assert cache.metrics.hits == 1
+    assert cache.metrics.expirations == 1
+
+
+def test_response_cache_limits_each_guild_independently():
+    cache = ResponseCache(ttl=10, max_entries_per_guild=2)
+    for index in range(3):
+        cache.put("busy", ("s", None, str(index)), str(index))
+    cache.put("quiet", ("s", None, "0"), "0")
+
+    assert cache.get("busy", ("s", None, "0")) is None
+    assert cache.get("busy", ("s", None, "2")) == "2"
+    assert cache.get("quiet", ("s", None, "0")) == "0"
+    assert cache.metrics.evictions == 1
+    assert len(cache) == 3
+
+
+def test_request_coalescer_shares_inflight_result():
+    coalescer = RequestCoalescer()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_call():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "shared"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(coalescer.run("key", slow_call)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(coalescer.run("key", slow_call)))
+    follower.start()
+    while coalescer.metrics.coalesced == 0:
+        time.sleep(0.001)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert results == ["shared", "shared"]
+    assert len(calls) == 1
+    assert coalescer.inflight == 0
+
+
+def test_request_coalescer_propagates_errors():
+    coalescer = RequestCoalescer()
+
+    def failing():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        coalescer.run("key", failing)
+    assert coalescer.run("key", lambda: "ok") == "ok"
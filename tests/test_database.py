@@ -25,3 +25,26 @@ def test_conversation_history_prunes_old_messages(tmp_path):
     assert messages[0].role == "system"
     assert len(messages) == 5
     assert messages[-1].content == "question-9"
+
+    history.add_message("user", "user", "question-10")
+    history.prune_conversation("user", max_messages=5, chunk=3)
+    messages = history.get_conversation("user")
+    assert [m.content for m in messages] == ["hello", "question-9", "question-10"]
+
+
+def test_pruned_messages_are_archived_and_searchable(tmp_path):
+    history = ConversationHistory(tmp_path / "history.db")
+    history.add_message("user", "system", "hello")
+    history.add_message("user", "user", "My cat is called Biscuit")
+    history.add_message("other", "user", "My cat is called Pepper")
+    for i in range(6):
+        history.add_message("user", "user", f"filler message {i}")
+        history.prune_conversation("other", max_messages=1)
+    history.prune_conversation("user", max_messages=3)
+
+    results = history.search_archive("user", "What is my cat called?")
+    assert [m.content for m in results] == ["My cat is called Biscuit"]
+    assert history.search_archive("user", "?!") == []
+
+    history.clear()
+    assert history.search_archive("user", "cat") == []
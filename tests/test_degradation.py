@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from visual_novel_chat.degradation import (
+    FULL,
+    REDUCED_FRAME,
+    REUSE_MOOD,
+    TEXT_ONLY,
+    DegradationController,
+)
+
+
+def test_queue_depth_selects_tier():
+    controller = DegradationController(queue_thresholds=(2, 4, 8), lag_thresholds=(None, None, None), cooldown=0)
+    assert [controller.pressure(depth) for depth in (0, 2, 5, 8)] == [FULL, REUSE_MOOD, REDUCED_FRAME, TEXT_ONLY]
+
+
+def test_loop_lag_selects_tier():
+    controller = DegradationController(queue_thresholds=(None, None, None), lag_thresholds=(0.1, 0.2, 0.5))
+    controller.observe_lag(0.25)
+    assert controller.update(0) == REDUCED_FRAME
+    assert controller.as_dict()["degrade_tier"] == "reduced_frame"
+
+
+def test_climbs_at_once_and_recovers_one_tier_per_cooldown(clock):
+    controller = DegradationController(queue_thresholds=(2, 4, 8), lag_thresholds=(None,) * 3, cooldown=5, clock=clock)
+    assert controller.update(10) == TEXT_ONLY
+
+    clock.now = 3
+    assert controller.update(0) == TEXT_ONLY, "still inside the cooldown"
+    clock.now = 5
+    assert controller.update(0) == REDUCED_FRAME
+    clock.now = 6
+    assert controller.update(0) == REDUCED_FRAME
+    clock.now = 10
+    assert controller.update(0) == REUSE_MOOD
+    clock.now = 15
+    assert controller.update(0) == FULL
+
+    metrics = controller.metrics.as_dict()
+    assert metrics["degrade_transitions"] == 4
+    assert metrics["degrade_text_only"] == 2
+    assert sum(controller.metrics.served) == 6
+
+
+def test_from_config_parses_thresholds_and_disables_zero():
+    controller = DegradationController.from_config(
+        {"DEGRADE-QUEUE-DEPTHS": "3,0,12", "DEGRADE-LOOP-LAG-MS": "50", "DEGRADE-COOLDOWN": "2"}
+    )
+    assert controller.queue_thresholds == (3, None, 12)
+    assert controller.lag_thresholds == (0.05, None, None)
+    assert controller.cooldown == 2
+
+
+def test_monitor_measures_blocked_loop():
+    controller = DegradationController()
+
+    async def scenario():
+        task = asyncio.create_task(controller.monitor(interval=0.01))
+        await asyncio.sleep(0.02)
+        time.sleep(0.15)
+        await asyncio.sleep(0.02)
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert controller.loop_lag >= 0.1
@@ -0,0 +1,36 @@
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from visual_novel_chat.encoding import EncodingProfile, FrameEncoder  # noqa: E402
+
+
+def noisy_image(size=(320, 240)):
+    return Image.effect_noise(size, 64).convert("RGBA")
+
+
+def test_frame_encoder_meets_byte_budget(tmp_path):
+    profiles = {"chat": EncodingProfile(("JPEG",), min_quality=10, max_quality=95)}
+    encoder = FrameEncoder(byte_budget=20_000, profiles=profiles)
+    frame = encoder.encode(noisy_image(), "chat", tmp_path / "screen")
+
+    assert frame.within_budget
+    assert frame.path == tmp_path / "screen.jpg"
+    assert frame.path.stat().st_size == frame.size <= 20_000
+    assert frame.quality < 95
+    assert encoder.metrics()["chat"]["frames"] == 1
+
+    second = encoder.encode(noisy_image(), "chat", tmp_path / "screen")
+    assert second.within_budget
+
+
+def test_frame_encoder_falls_back_to_next_format(tmp_path):
+    profiles = {"map": EncodingProfile(("PNG", "JPEG"), min_quality=10, max_quality=90)}
+    encoder = FrameEncoder(byte_budget=20_000, profiles=profiles)
+    frame = encoder.encode(noisy_image(), "map", tmp_path / "screen")
+
+    assert frame.format == "JPEG"
+    assert frame.within_budget
+
+    flat = Image.new("RGBA", (320, 240), (30, 60, 90, 255))
+    assert encoder.encode(flat, "map", tmp_path / "screen").format == "PNG"
@@ -0,0 +1,83 @@
+from visual_novel_chat.lexicon import (
+    CascadeClassifier,
+    LexiconScorer,
+    build_lexicon,
+    evaluate,
+    load_lexicon,
+    save_lexicon,
+)
+
+
+class FakeSynset:
+    def __init__(self, lemmas, similar=()):
+        self._lemmas = lemmas
+        self._similar = similar
+
+    def lemma_names(self):
+        return self._lemmas
+
+    def similar_tos(self):
+        return list(self._similar)
+
+
+class FakeWordNet:
+    synonyms = {
+        "happy": [FakeSynset(["happy"], [FakeSynset(["blissful", "glad"])])],
+        "sad": [FakeSynset(["sad", "deplorable", "blue"])],
+        "angry": [FakeSynset(["angry", "blue"])],
+    }
+
+    def synsets(self, word):
+        return self.synonyms.get(word, [])
+
+
+class RecordingModel:
+    def __init__(self, label="sadness"):
+        self.label = label
+        self.calls = []
+
+    def predict(self, text):
+        self.calls.append(text)
+        return {"label": self.label, "score": 0.9}
+
+
+def test_build_lexicon_expands_synonyms_and_drops_conflicts(tmp_path):
+    seeds = {"joy": ("happy",), "sadness": ("sad",), "anger": ("angry",)}
+    lexicon = build_lexicon(seeds, wordnet=FakeWordNet())
+    assert lexicon["blissful"] == "joy"
+    assert lexicon["deplorable"] == "sadness"
+    assert "blue" not in lexicon
+
+    path = tmp_path / "lexicon.tsv"
+    save_lexicon(lexicon, path)
+    assert load_lexicon(path) == lexicon
+    assert load_lexicon(tmp_path / "missing.tsv") == build_lexicon()
+
+
+def test_scorer_answers_only_when_confident():
+    scorer = LexiconScorer({"happy": "joy", "smile": "joy", "scared": "fear"})
+    assert scorer.score("I'm so happy, you make me smile!") == {"label": "joy", "score": 1.0}
+    assert scorer.score("Smiles make me happy") == {"label": "joy", "score": 1.0}
+    assert scorer.score("I'm so happy") is None, "a single cue word is not conclusive"
+    assert scorer.score("I'm happy but also scared") is None
+    assert scorer.score("I'm not happy about this") is None
+    assert scorer.score("Let's walk to the bridge") is None
+
+
+def test_cascade_falls_back_and_reports_metrics():
+    model = RecordingModel()
+    cascade = CascadeClassifier(model, LexiconScorer({"happy": "joy", "smile": "joy"}))
+    assert cascade.predict("I'm so happy, you make me smile!")["label"] == "joy"
+    assert cascade.predict("The river is calm today.")["label"] == "sadness"
+    assert model.calls == ["The river is calm today."]
+    assert cascade.metrics.as_dict() == {
+        "emotion_fast_path": 1,
+        "emotion_fallback": 1,
+        "emotion_fast_path_ratio": 0.5,
+    }
+
+    report = evaluate(cascade, [("I'm so happy, you make me smile!", "joy"), ("Hello.", "sadness")])
+    assert report["fast_path_ratio"] == 0.5
+    assert report["agreement"] == 0.0
+    assert report["cascade_accuracy"] == 1.0
+    assert report["model_accuracy"] == 0.5
@@ -0,0 +1,92 @@
+import asyncio
+import io
+import logging
+import threading
+
+from visual_novel_chat.log import (
+    RequestIdFilter,
+    SamplingFilter,
+    configure_logging,
+    current_request_id,
+    request_context,
+    with_request_context,
+)
+
+
+def make_record(level=logging.DEBUG):
+    return logging.LogRecord("test", level, __file__, 1, "message", (), None)
+
+
+def test_request_context_sets_and_resets_id():
+    assert current_request_id() == "-"
+    with request_context("gwen") as request_id:
+        assert request_id.startswith("gwen-")
+        record = make_record()
+        RequestIdFilter().filter(record)
+        assert record.request_id == request_id
+    assert current_request_id() == "-"
+
+
+def test_with_request_context_wraps_coroutines():
+    async def callback():
+        return current_request_id()
+
+    request_id = asyncio.run(with_request_context(callback)())
+    assert request_id.startswith("callback-")
+
+
+def test_sampling_filter_is_consistent_within_request():
+    sampler = SamplingFilter(0.5)
+    assert sampler.filter(make_record(logging.INFO))
+    with request_context():
+        decisions = {sampler.filter(make_record()) for _ in range(20)}
+    assert len(decisions) == 1
+    assert all(SamplingFilter(1.0).filter(make_record()) for _ in range(5))
+
+
+def test_configure_logging_routes_through_queue():
+    stream = io.StringIO()
+    root = logging.getLogger()
+    previous_handlers, previous_level = list(root.handlers), root.level
+    listener = configure_logging("INFO", sample_rate=1.0, stream=stream)
+    try:
+        with request_context("bench") as request_id:
+            logging.getLogger("visual_novel_chat.test").info("hello %s", "world")
+            logging.getLogger("visual_novel_chat.test").debug("hidden")
+    finally:
+        listener.stop()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in previous_handlers:
+            root.addHandler(handler)
+        root.setLevel(previous_level)
+
+    output = stream.getvalue()
+    assert f"[{request_id}] visual_novel_chat.test: hello world" in output
+    assert "hidden" not in output
+
+
+def test_configure_logging_formats_on_listener_thread():
+    class Argument:
+        formatted_on = None
+
+        def __str__(self):
+            Argument.formatted_on = threading.get_ident()
+            return "argument"
+
+    stream = io.StringIO()
+    root = logging.getLogger()
+    previous_handlers, previous_level = list(root.handlers), root.level
+    listener = configure_logging("INFO", sample_rate=1.0, stream=stream)
+    try:
+        logging.getLogger("visual_novel_chat.test").info("lazy %s", Argument())
+    finally:
+        listener.stop()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in previous_handlers:
+            root.addHandler(handler)
+        root.setLevel(previous_level)
+
+    assert "lazy argument" in stream.getvalue()
+    assert Argument.formatted_on not in (None, threading.get_ident())
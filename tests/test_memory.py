@@ -0,0 +1,90 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from visual_novel_chat.cache import ResponseCache
+from visual_novel_chat.memory import MemoryAccountant, serve_memory_endpoint
+
+
+class FakeModel:
+    def __init__(self, size):
+        self.size = size
+
+    def memory_bytes(self):
+        return self.size
+
+    def unload(self):
+        released, self.size = self.size, 0
+        return released
+
+
+def filled_cache(entries):
+    cache = ResponseCache(ttl=60)
+    for index in range(entries):
+        cache.put(str(index % 3), ("system", "bridge", f"prompt {index}"), "reply " * 50)
+    return cache
+
+
+def test_enforce_evicts_lowest_priority_first():
+    cache = filled_cache(30)
+    model = FakeModel(10_000)
+    accountant = MemoryAccountant(budget=cache.nbytes // 2 + model.size)
+    accountant.register("response_cache", lambda: cache.nbytes, cache.evict, priority=0)
+    accountant.register("emotion_model", model.memory_bytes, lambda _: model.unload(), priority=10)
+    accountant.register("assets", lambda: 1_000)
+
+    assert accountant.enforce() > 0
+    assert sum(accountant.usage().values()) <= accountant.budget
+    assert 0 < len(cache) < 30
+    assert model.size == 10_000
+
+    accountant.budget = 5_000
+    accountant.enforce()
+    assert len(cache) == 0 and cache.nbytes == 0
+    assert model.size == 0
+    assert accountant.metrics.evictions == 3
+
+
+def test_enforce_does_not_evict_when_the_budget_is_out_of_reach(caplog):
+    cache = filled_cache(30)
+    model = FakeModel(10_000)
+    accountant = MemoryAccountant(budget=500)
+    accountant.register("response_cache", lambda: cache.nbytes, cache.evict, priority=0)
+    accountant.register("emotion_model", model.memory_bytes, lambda _: model.unload(), priority=10)
+    accountant.register("assets", lambda: 1_000)
+
+    for _ in range(3):
+        assert accountant.enforce() == 0
+    assert model.size == 10_000, "the model is not unloaded on every request"
+    assert len(cache) == 30
+    assert accountant.metrics.evictions == 0
+    assert accountant.metrics.over_budget == 3
+    assert len([record for record in caplog.records if record.levelname == "WARNING"]) == 1
+
+
+def test_unbounded_accountant_never_evicts():
+    cache = filled_cache(5)
+    accountant = MemoryAccountant()
+    accountant.register("response_cache", lambda: cache.nbytes, cache.evict)
+    assert accountant.enforce() == 0
+    assert len(cache) == 5
+
+
+def test_memory_endpoint_serves_report():
+    accountant = MemoryAccountant(budget=2**20)
+    accountant.register("session", lambda: 1234)
+    server = serve_memory_endpoint(accountant, port=0)
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{base}/memory", timeout=5) as response:
+            report = json.load(response)
+        assert report["categories"] == {"session": 1234}
+        assert report["budget"] == 2**20
+        assert all(value > 0 for value in report["process"].values())
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{base}/other", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,83 @@
+import asyncio
+import pstats
+
+import pytest
+
+from visual_novel_chat.profiling import Profiler
+
+
+def busy_work():
+    return sum(i * i for i in range(1000))
+
+
+def test_profiler_skips_when_disabled(tmp_path):
+    profiler = Profiler(output_dir=tmp_path)
+    with profiler.profile("gwen"):
+        busy_work()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_profiler_dumps_cprofile_and_enforces_retention(tmp_path):
+    profiler = Profiler(sample_rate=1.0, output_dir=tmp_path, max_profiles=2)
+    for _ in range(4):
+        with profiler.profile("gwen"):
+            busy_work()
+
+    profiles = sorted(tmp_path.glob("*-gwen.prof"))
+    assert len(profiles) == 2
+    stats = pstats.Stats(str(profiles[-1]))
+    assert any(func[2] == "busy_work" for func in stats.stats)
+
+
+def test_profiler_wrap_and_stack_mode(tmp_path):
+    profiler = Profiler(sample_rate=1.0, output_dir=tmp_path, mode="stacks", stack_interval=0.001)
+
+    async def callback(value):
+        deadline = asyncio.get_running_loop().time() + 0.05
+        while asyncio.get_running_loop().time() < deadline:
+            busy_work()
+        return value
+
+    wrapped = profiler.wrap(callback)
+    assert asyncio.run(wrapped(3)) == 3
+    lines = (tmp_path / "stacks.folded").read_text().splitlines()
+    assert lines
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_profiler_rejects_invalid_rate():
+    with pytest.raises(ValueError):
+        Profiler(sample_rate=1.5)
+
+
+def worker_busy_work():
+    return sum(i * i for i in range(1000))
+
+
+def test_profiler_includes_bound_worker_thread_calls(tmp_path):
+    profiler = Profiler(sample_rate=1.0, output_dir=tmp_path)
+
+    async def handler():
+        with profiler.profile("gwen"):
+            return await asyncio.to_thread(profiler.bind(worker_busy_work))
+
+    asyncio.run(handler())
+    stats = pstats.Stats(str(next(tmp_path.glob("*-gwen.prof"))))
+    assert any(func[2] == "worker_busy_work" for func in stats.stats)
+    assert profiler.bind(worker_busy_work) is worker_busy_work, "unsampled calls are not wrapped"
+
+
+def test_stack_mode_samples_bound_worker_threads(tmp_path):
+    profiler = Profiler(sample_rate=1.0, output_dir=tmp_path, mode="stacks", stack_interval=0.001)
+
+    def slow_query():
+        import time
+
+        time.sleep(0.05)
+
+    async def handler():
+        with profiler.profile("gwen"):
+            await asyncio.to_thread(profiler.bind(slow_query))
+
+    asyncio.run(handler())
+    assert "slow_query" in (tmp_path / "stacks.folded").read_text()
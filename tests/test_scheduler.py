@@ -0,0 +1,209 @@
+import asyncio
+import threading
+
+import pytest
+
+from visual_novel_chat.log import current_request_id, request_context
+from visual_novel_chat.scheduler import FairScheduler, SchedulerBusy, TokenBucket
+
+
+def test_token_bucket_refills_over_time(clock):
+    bucket = TokenBucket(rate=1.0, capacity=2, clock=clock)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    clock.now = 1.5
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+
+def test_scheduler_rejects_rate_limited_users():
+    async def scenario():
+        scheduler = FairScheduler(user_rate=0, user_burst=1, guild_rate=0, guild_burst=10)
+        assert await scheduler.submit("guild", "user", lambda: "ok") == "ok"
+        with pytest.raises(SchedulerBusy) as excinfo:
+            await scheduler.submit("guild", "user", lambda: "ok")
+        assert excinfo.value.reason == "user rate limited"
+        assert await scheduler.submit("guild", "other", lambda value, guild_id: value + guild_id, "a", guild_id="b") == "ab"
+        await scheduler.close()
+        return scheduler.metrics
+
+    metrics = asyncio.run(scenario())
+    assert metrics.completed == 2
+    assert metrics.rate_limited == 1
+
+
+def test_scheduler_rejects_when_queue_full():
+    release = threading.Event()
+
+    async def scenario():
+        scheduler = FairScheduler(max_queue=1, user_burst=10, guild_burst=10)
+        blocker = asyncio.create_task(scheduler.submit("g", "u", release.wait, 5))
+        await asyncio.sleep(0.05)
+        queued = asyncio.create_task(scheduler.submit("g", "u", lambda: "queued"))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerBusy) as excinfo:
+            await scheduler.submit("g", "u", lambda: "rejected")
+        release.set()
+        assert await queued == "queued"
+        await blocker
+        await scheduler.close()
+        return excinfo.value.reason
+
+    assert asyncio.run(scenario()) == "queue full"
+
+
+def test_scheduler_bounds_each_guild_queue():
+    release = threading.Event()
+
+    async def scenario():
+        scheduler = FairScheduler(max_queue=10, max_queue_per_guild=1, user_burst=10, guild_burst=10)
+        blocker = asyncio.create_task(scheduler.submit("g", "u", release.wait, 5))
+        await asyncio.sleep(0.05)
+        queued = asyncio.create_task(scheduler.submit("g", "u", lambda: "queued"))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerBusy) as excinfo:
+            await scheduler.submit("g", "u", lambda: "rejected")
+        other = asyncio.create_task(scheduler.submit("other", "u2", lambda: "other"))
+        release.set()
+        results = await asyncio.gather(queued, other)
+        await blocker
+        await scheduler.close()
+        return excinfo.value.reason, results
+
+    assert asyncio.run(scenario()) == ("guild queue full", ["queued", "other"])
+
+
+def test_scheduler_interleaves_guilds_fairly():
+    release = threading.Event()
+    order = []
+
+    async def scenario():
+        scheduler = FairScheduler(max_queue=100, max_queue_per_guild=10, user_burst=100, guild_burst=100)
+        blocker = asyncio.create_task(scheduler.submit("warmup", "u", release.wait, 5))
+        await asyncio.sleep(0.05)
+        tasks = [
+            asyncio.create_task(scheduler.submit("noisy", f"n{i}", order.append, "noisy"))
+            for i in range(6)
+        ]
+        await asyncio.sleep(0)
+        tasks += [
+            asyncio.create_task(scheduler.submit("quiet", f"q{i}", order.append, "quiet"))
+            for i in range(2)
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.queue_depths() == {"noisy": 6, "quiet": 2}
+        release.set()
+        await asyncio.gather(blocker, *tasks)
+        await scheduler.close()
+
+    asyncio.run(scenario())
+    assert order[:4].count("quiet") == 2
+
+
+def test_scheduler_runs_work_in_the_submitters_context():
+    async def submit(scheduler):
+        with request_context("gwen") as request_id:
+            return request_id, await scheduler.submit("guild", request_id, current_request_id)
+
+    async def scenario():
+        scheduler = FairScheduler(workers=2, user_burst=10, guild_burst=10)
+        results = await asyncio.gather(*(submit(scheduler) for _ in range(3)))
+        await scheduler.close()
+        return results
+
+    results = asyncio.run(scenario())
+    assert len({request_id for request_id, _ in results}) == 3
+    assert all(seen == request_id for request_id, seen in results)
+
+
+def test_scheduler_answers_repeats_with_the_pending_result():
+    release = threading.Event()
+    lock = threading.Lock()
+    calls = []
+    running = [0, 0]
+
+    def work(name):
+        with lock:
+            calls.append(name)
+            running[0] += 1
+            running[1] = max(running)
+        release.wait(1)
+        with lock:
+            running[0] -= 1
+        return name
+
+    async def scenario():
+        scheduler = FairScheduler(workers=1, user_rate=0, user_burst=1, guild_burst=10)
+        repeats = [
+            asyncio.create_task(scheduler.submit("g", "u", work, f"repeat {i}", coalesce_key="hi")) for i in range(15)
+        ]
+        await asyncio.sleep(0.05)
+        assert scheduler.queue_depths() == {}, "the first one is running and the repeats queue nothing"
+        other_user = asyncio.create_task(scheduler.submit("g", "other", work, "other user", coalesce_key="hi"))
+        await asyncio.sleep(0)
+        assert scheduler.queue_depths() == {"g": 1}, "another user's request is admitted and queued"
+        with pytest.raises(SchedulerBusy):
+            await scheduler.submit("other-guild", "u", work, "other guild", coalesce_key="hi")
+        release.set()
+        results = await asyncio.gather(*repeats, other_user)
+        await scheduler.close()
+        return scheduler.metrics, results
+
+    metrics, results = asyncio.run(scenario())
+    assert calls == ["repeat 0", "other user"]
+    assert running[1] == 1
+    assert results == ["repeat 0"] * 15 + ["other user"]
+    assert metrics.coalesced == 14
+    assert metrics.submitted == 2
+    assert metrics.rate_limited == 1, "the same user in another guild still needs a token"
+
+
+def test_scheduler_only_repeats_the_users_latest_request():
+    release = threading.Event()
+    calls = []
+
+    def work(name):
+        calls.append(name)
+        release.wait(1)
+        return name
+
+    async def scenario():
+        scheduler = FairScheduler(workers=1, user_rate=0, user_burst=3, guild_burst=10)
+        first = asyncio.create_task(scheduler.submit("g", "u", work, "first", coalesce_key="hi"))
+        await asyncio.sleep(0)
+        other = asyncio.create_task(scheduler.submit("g", "u", work, "other", coalesce_key="bye"))
+        await asyncio.sleep(0)
+        again = asyncio.create_task(scheduler.submit("g", "u", work, "again", coalesce_key="hi"))
+        await asyncio.sleep(0.05)
+        release.set()
+        results = await asyncio.gather(first, other, again)
+        await scheduler.close()
+        return scheduler.metrics, results
+
+    metrics, results = asyncio.run(scenario())
+    assert results == ["first", "other", "again"]
+    assert calls == results
+    assert metrics.coalesced == 0
+
+
+def test_cancelled_submitter_does_not_cancel_a_shared_request():
+    release = threading.Event()
+
+    def work():
+        release.wait(1)
+        return "done"
+
+    async def scenario():
+        scheduler = FairScheduler(workers=1, user_rate=0, user_burst=1)
+        leader = asyncio.create_task(scheduler.submit("g", "u", work, coalesce_key="hi"))
+        await asyncio.sleep(0)
+        repeat = asyncio.create_task(scheduler.submit("g", "u", work, coalesce_key="hi"))
+        await asyncio.sleep(0)
+        leader.cancel()
+        release.set()
+        result = await repeat
+        await scheduler.close()
+        return result
+
+    assert asyncio.run(scenario()) == "done"
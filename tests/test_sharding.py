@@ -0,0 +1,142 @@
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from visual_novel_chat.database import ConversationHistory, HistoryStore
+from visual_novel_chat.sharding import ShardPlan, launch_shards, shard_for_guild, shard_ranges
+
+
+def test_shard_for_guild_matches_discord_formula():
+    guild_id = 81384788765712384
+    assert shard_for_guild(guild_id, 4) == (guild_id >> 22) % 4
+    assert shard_for_guild(None, 4) == 0
+    with pytest.raises(ValueError):
+        shard_for_guild(guild_id, 0)
+
+
+def test_shard_ranges_partition_all_shards():
+    ranges = shard_ranges(10, 3)
+    assert ranges == [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]]
+    with pytest.raises(ValueError):
+        shard_ranges(2, 3)
+
+
+def test_plan_assigns_each_guild_to_the_process_owning_its_shard():
+    plan = ShardPlan.build(shard_count=6, processes=3)
+    for shard in range(6):
+        guild_id = (shard << 22) + 7
+        assert shard in plan.ranges[plan.process_for_guild(guild_id)]
+    assert plan.process_for_guild(None) == 0
+
+
+def test_create_bot_connects_only_its_shards(tmp_path):
+    pytest.importorskip("PIL")
+    discord = pytest.importorskip("discord")
+    from visual_novel_chat.bot import create_bot
+
+    config = {"BOT-NAME": "Gwen"}
+    history = ConversationHistory(tmp_path / "history.db")
+    sharded = create_bot(config, history=history, shard_ids=[2, 3], shard_count=4)
+    assert isinstance(sharded, discord.AutoShardedClient)
+    assert sharded.shard_ids == [2, 3]
+    assert sharded.shard_count == 4
+
+    single = create_bot(config, history=history)
+    assert not isinstance(single, discord.AutoShardedClient)
+
+
+def record_shard(out_dir, shard_ids, shard_count, manifest):
+    from visual_novel_chat.assets import SharedAssets
+
+    images = 0
+    if manifest is not None:
+        with SharedAssets.attach(manifest) as assets:
+            images = len(assets.images())
+    record = {"shard_ids": list(shard_ids), "shard_count": shard_count, "images": images}
+    (Path(out_dir) / f"{shard_ids[0]}.json").write_text(json.dumps(record))
+    if 4 in shard_ids:
+        deadline = time.monotonic() + 30
+        while len(list(Path(out_dir).glob("*.json"))) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        sys.exit(3)
+
+
+def killed_shard(out_dir, shard_ids, shard_count, manifest):
+    if 0 in shard_ids:
+        os.kill(os.getpid(), signal.SIGKILL)
+
+
+def test_launch_shards_runs_one_process_per_range(tmp_path):
+    status = launch_shards(str(tmp_path), shard_count=6, processes=3, target=record_shard)
+
+    records = sorted((json.loads(path.read_text()) for path in tmp_path.glob("*.json")), key=lambda r: r["shard_ids"])
+    assert [record["shard_ids"] for record in records] == [[0, 1], [2, 3], [4, 5]]
+    assert all(record["shard_count"] == 6 for record in records)
+    assert all(record["images"] > 0 for record in records), "workers attach to the shared assets"
+    assert status == 3, "a failing worker's exit code is reported"
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs POSIX signals")
+def test_launch_shards_reports_workers_killed_by_a_signal(tmp_path):
+    status = launch_shards(str(tmp_path), shard_count=2, processes=2, target=killed_shard, share_assets=False)
+    assert status == 128 + signal.SIGKILL
+
+
+def crashing_shard(out_dir, shard_ids, shard_count, manifest):
+    if 0 in shard_ids:
+        sys.exit(5)
+    time.sleep(60)
+
+
+def test_launch_shards_stops_the_others_when_one_crashes(tmp_path):
+    started = time.monotonic()
+    status = launch_shards(str(tmp_path), shard_count=3, processes=3, target=crashing_shard, share_assets=False)
+    assert status == 5, "the crashed worker's status is returned"
+    assert time.monotonic() - started < 30, "the surviving workers were terminated"
+
+
+def shard_worker(db_path, inbox, results):
+    history = ConversationHistory(db_path)
+    while True:
+        event = inbox.get()
+        if event is None:
+            break
+        user_id, content = event
+        history.add_message(user_id, "user", content)
+        history.prune_conversation(user_id)
+        results.put(user_id)
+
+
+def test_shard_processes_share_the_history_database(tmp_path):
+    db_path = tmp_path / "history.db"
+    assert isinstance(ConversationHistory(db_path), HistoryStore)
+    plan = ShardPlan.build(shard_count=6, processes=3)
+    context = multiprocessing.get_context("spawn")
+    inboxes = [context.Queue() for _ in plan.ranges]
+    results = context.Queue()
+    workers = [context.Process(target=shard_worker, args=(str(db_path), inbox, results)) for inbox in inboxes]
+    for worker in workers:
+        worker.start()
+
+    guild_ids = [(shard << 22) + 7 for shard in range(plan.shard_count)] + [None]
+    for round_number in range(5):
+        for guild_id in guild_ids:
+            inboxes[plan.process_for_guild(guild_id)].put((f"user-{guild_id}", f"message {round_number}"))
+    for inbox in inboxes:
+        inbox.put(None)
+    for _ in range(5 * len(guild_ids)):
+        results.get(timeout=30)
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+    history = ConversationHistory(db_path)
+    for guild_id in guild_ids:
+        messages = history.get_conversation(f"user-{guild_id}")
+        assert [m.content for m in messages] == [f"message {n}" for n in range(5)]
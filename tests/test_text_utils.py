@@ -1,4 +1,4 @@
-from visual_novel_chat.text_utils import paginate_text, wrap_text
+from visual_novel_chat.text_utils import extract_terms, paginate_text, wrap_text
 
 
 def test_wrap_text_limits_line_length():
@@ -15,3 +15,11 @@ def test_paginate_text_splits_on_line_count():
 
 def test_paginate_text_empty_string_returns_single_page():
     assert paginate_text("", lines_per_page=3) == [""]
+
+
+def test_extract_terms_skips_stopwords_and_duplicates():
+    assert extract_terms("Do you remember the Bridge and the bridge at night?") == [
+        "remember",
+        "bridge",
+        "night",
+    ]
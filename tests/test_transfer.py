@@ -0,0 +1,64 @@
+import gzip
+import json
+
+import pytest
+
+from visual_novel_chat.__main__ import run
+from visual_novel_chat.database import ConversationHistory
+from visual_novel_chat.transfer import export_jsonl, import_jsonl
+
+
+def seed(history):
+    history.add_message("ann", "system", "system")
+    for word in ["tulip", "river", "lantern", "festival", "picnic", "umbrella"]:
+        history.add_message("ann", "user", f"ann talks about the {word}")
+    history.prune_conversation("ann", max_messages=3)
+    history.add_message("bob", "user", "bob question")
+    with history._connect() as conn:
+        conn.execute("UPDATE conversation SET timestamp = '2024-01-01 00:00:00' WHERE user_id = 'bob'")
+
+
+def test_export_import_round_trip_with_gzip(tmp_path):
+    source = ConversationHistory(tmp_path / "source.db")
+    seed(source)
+    path = tmp_path / "history.jsonl.gz"
+    assert export_jsonl(source, path) == 8
+    rows = [json.loads(line) for line in gzip.open(path, "rt", encoding="utf-8")]
+    assert [row["table"] for row in rows].count("archive") == 4
+
+    target = ConversationHistory(tmp_path / "target.db")
+    for i in range(5):
+        target.add_message("carol", "user", f"carol message {i}")
+    assert import_jsonl(target, path, batch_size=3) == 8
+    assert target.get_conversation("ann") == source.get_conversation("ann")
+    assert [m.content for m in target.search_archive("ann", "the lantern")] == ["ann talks about the lantern"]
+
+    # Existing messages must not collide with imported archive ids when pruned.
+    target.prune_conversation("carol", max_messages=2)
+    assert len(target.search_archive("carol", "message", limit=10)) == 3
+    assert target.search_archive("ann", "tulip")
+
+
+def test_cli_filters_by_user_and_time(tmp_path, capsys):
+    db_path = tmp_path / "source.db"
+    seed(ConversationHistory(db_path))
+    output = tmp_path / "bob.jsonl"
+
+    assert run(["export", str(output), "--db", str(db_path), "--user", "bob", "--until", "2024-06-01"]) == 0
+    rows = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert [(row["user_id"], row["content"]) for row in rows] == [("bob", "bob question")]
+    assert run(["export", str(output), "--db", str(db_path), "--since", "2024-06-01", "--table", "conversation"]) == 0
+    assert all(json.loads(line)["user_id"] == "ann" for line in output.read_text(encoding="utf-8").splitlines())
+
+    assert run(["import", str(output), "--db", str(tmp_path / "copy.db")]) == 0
+    assert "imported 3 rows" in capsys.readouterr().err
+
+
+def test_cli_rejects_non_positive_batch_size(tmp_path, capsys):
+    for value in ("0", "-5"):
+        with pytest.raises(SystemExit) as excinfo:
+            run(["import", str(tmp_path / "rows.jsonl"), "--batch-size", value])
+        assert excinfo.value.code == 2
+    assert "must be a positive integer" in capsys.readouterr().err
+    with pytest.raises(ValueError):
+        ConversationHistory(tmp_path / "history.db").import_rows([], batch_size=0)
@@ -0,0 +1,150 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("discord")
+
+from visual_novel_chat.visual_novel import QUIT_MESSAGE, VisualNovel  # noqa: E402
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+class FakeResponse:
+    def __init__(self, api):
+        self.api = api
+        self.done = False
+
+    def is_done(self):
+        return self.done
+
+    async def defer(self):
+        self.api.calls.append("defer")
+        self.done = True
+
+
+class FakeMessage:
+    def __init__(self, message_id):
+        self.id = message_id
+
+
+class FakeInteraction:
+    """Minimal stand-in for a component interaction that records REST calls."""
+
+    def __init__(self, api, message_id=1):
+        self.api = api
+        self.response = FakeResponse(api)
+        self.message = FakeMessage(message_id)
+
+    async def edit_original_response(self, **kwargs):
+        self.api.calls.append("edit")
+        self.api.edits.append(kwargs)
+        await asyncio.sleep(self.api.latency)
+
+
+class FakeDiscord:
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.calls = []
+        self.edits = []
+
+    def interaction(self, message_id=1):
+        return FakeInteraction(self, message_id)
+
+
+@pytest.fixture
+def visual_novel(tmp_path):
+    novel = VisualNovel({"BOT-NAME": "Gwen"}, assets_root=PROJECT_ROOT)
+    novel.output_dir = tmp_path
+    novel.load_images()
+    return novel
+
+
+def press(novel, api, name):
+    """Press the button bound to callback *name* the way discord.py would."""
+
+    for view in novel.views:
+        for item in view.children:
+            if item.callback.__name__ == name:
+                return item.callback(api.interaction())
+    raise LookupError(name)
+
+
+def test_navigation_defers_and_edits_in_place(visual_novel):
+    api = FakeDiscord(latency=0)
+
+    async def scenario():
+        visual_novel.load_views()
+        await press(visual_novel, api, "button_menu_callback")
+        await press(visual_novel, api, "button_down_callback")
+
+    asyncio.run(scenario())
+    assert api.calls == ["defer", "edit", "defer", "edit"]
+    assert api.edits[-1]["view"] is visual_novel.views[1]
+    assert api.edits[-1]["attachments"][0].filename == visual_novel.output_file.name
+
+
+def test_rapid_clicks_coalesce_into_one_final_edit(visual_novel):
+    api = FakeDiscord(latency=0.05)
+
+    async def scenario():
+        visual_novel.load_views()
+        visual_novel.state = 1
+        await asyncio.gather(*(press(visual_novel, api, "button_down_callback") for _ in range(6)))
+
+    asyncio.run(scenario())
+    assert api.calls.count("defer") == 6
+    assert api.calls.count("edit") == 2
+    assert visual_novel.menu_position == 3
+    assert len(api.calls) / 6 < 2, "previously every click cost a delete and a send"
+
+
+def test_quit_edits_message_content(visual_novel):
+    api = FakeDiscord(latency=0)
+
+    async def scenario():
+        visual_novel.load_views()
+        await visual_novel.render_quit(api.interaction())
+
+    asyncio.run(scenario())
+    assert api.edits == [{"content": QUIT_MESSAGE, "attachments": [], "view": None}]
+
+
+def test_reduced_frames_reuse_cached_scene_at_half_size(visual_novel):
+    from PIL import Image
+
+    visual_novel.prepare_chat_pages("Hello there!")
+    asyncio.run(visual_novel.render_waifu_chat())
+    full = visual_novel.frame.size
+    assert Image.open(visual_novel.output_file).size == (720, 540)
+
+    asyncio.run(visual_novel.render_waifu_chat(reduced=True))
+    asyncio.run(visual_novel.render_waifu_chat(reduced=True))
+    assert Image.open(visual_novel.output_file).size == (360, 270)
+    assert visual_novel.frame.size < full
+    assert set(visual_novel.encoder.metrics()) == {"chat", "chat:reduced"}
+    assert len(visual_novel._scenes) == 1
+    assert visual_novel.scene_cache_bytes() == 720 * 540 * 4
+
+    assert visual_novel.evict_scenes(1) == 720 * 540 * 4
+    assert visual_novel.scene_cache_bytes() == 0
+
+
+def test_button_renders_ask_for_the_current_tier(visual_novel):
+    from PIL import Image
+
+    api = FakeDiscord(latency=0)
+    tiers = iter([True, False])
+    visual_novel.reduce_frames = lambda: next(tiers)
+
+    async def scenario():
+        visual_novel.load_views()
+        await press(visual_novel, api, "button_menu_callback")
+        reduced = Image.open(visual_novel.output_file).size
+        await press(visual_novel, api, "button_down_callback")
+        return reduced
+
+    assert asyncio.run(scenario()) == (360, 270)
+    assert Image.open(visual_novel.output_file).size == (720, 540)
+    assert set(visual_novel.encoder.metrics()) == {"menu", "menu:reduced"}
@@ -5,11 +5,12 @@ from __future__ import annotations
 import logging
 
 from visual_novel_chat.bot import main
+from visual_novel_chat.log import configure_logging
 
 logger = logging.getLogger(__name__)
 
 
 if __name__ == "__main__":
-    logging.basicConfig(level=logging.INFO)
+    configure_logging()
     logger.info("Launching visual_novel_chat via legacy entry point")
     main()
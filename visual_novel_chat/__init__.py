@@ -21,7 +21,6 @@ logger = logging.getLogger(__name__)
 
 
 def __getattr__(name: str) -> Any:  # pragma: no cover - thin import wrapper
-    logger.debug("Lazy-loading attribute '%s' from package", name)
     if name in {"create_bot", "main"}:
         module = import_module(".bot", __name__)
     elif name in {"AiResponder", "EmotionClassifier", "ensure_nltk_data"}:
@@ -38,5 +37,4 @@ def __getattr__(name: str) -> Any:  # pragma: no cover - thin import wrapper
 
 
 def __dir__() -> list[str]:  # pragma: no cover - thin wrapper
-    logger.debug("Listing available attributes for package")
     return sorted(__all__)
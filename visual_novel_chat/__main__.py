@@ -1,15 +1,106 @@
-"""Allow running ``python -m visual_novel_chat`` to start the bot."""
+"""Allow running ``python -m visual_novel_chat`` to start the bot or manage its history."""
 
 from __future__ import annotations
 
+import argparse
 import logging
+import sys
+import time
+from typing import Optional, Sequence
 
-from .bot import main
+from .constants import DEFAULT_DB_PATH
+from .database import EXPORT_TABLES, ConversationHistory
+from .log import configure_logging
+from .transfer import export_jsonl, import_jsonl, parse_timestamp
 
 logger = logging.getLogger(__name__)
 
 
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m visual_novel_chat",
+        description="Run the Visual Novel Discord chat bot.",
+    )
+    parser.add_argument("--config", default="waifu_config.json", help="path to the bot configuration")
+    parser.add_argument(
+        "--shard-count",
+        type=int,
+        help="total number of gateway shards; enables AutoShardedBot",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="number of bot processes, each owning a contiguous shard range",
+    )
+
+    commands = parser.add_subparsers(dest="command", metavar="{export,import}")
+    export = commands.add_parser("export", help="write conversation history to a JSONL file")
+    export.add_argument("output", help="destination file, '-' for stdout; '.gz' names are gzipped")
+    export.add_argument("--db", default=DEFAULT_DB_PATH, help="history database (default: %(default)s)")
+    export.add_argument("--user", action="append", dest="users", help="only export this user ID (repeatable)")
+    export.add_argument("--since", type=parse_timestamp, help="only messages at or after this ISO time")
+    export.add_argument("--until", type=parse_timestamp, help="only messages before this ISO time")
+    export.add_argument(
+        "--table",
+        choices=["conversation", "archive", "all"],
+        default="all",
+        help="live conversations, the pruned archive, or both (default)",
+    )
+    export.add_argument("--gzip", action="store_true", default=None, help="compress even without a '.gz' name")
+
+    load = commands.add_parser("import", help="append conversation history from a JSONL file")
+    load.add_argument("input", help="source file, '-' for stdin; '.gz' names are decompressed")
+    load.add_argument("--db", default=DEFAULT_DB_PATH, help="history database (default: %(default)s)")
+    load.add_argument("--batch-size", type=positive_int, default=50_000, help="rows per transaction")
+    load.add_argument("--gzip", action="store_true", default=None, help="decompress even without a '.gz' name")
+    return parser
+
+
+def transfer(args: argparse.Namespace) -> int:
+    """Run the ``export`` or ``import`` subcommand."""
+
+    history = ConversationHistory(args.db)
+    started = time.perf_counter()
+    if args.command == "export":
+        tables = EXPORT_TABLES if args.table == "all" else (args.table,)
+        count = export_jsonl(history, args.output, tables, args.users, args.since, args.until, args.gzip)
+    else:
+        count = import_jsonl(history, args.input, args.batch_size, args.gzip)
+    elapsed = time.perf_counter() - started
+    print(
+        f"{args.command}ed {count} rows in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f} rows/s)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def run(argv: Optional[Sequence[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is not None:
+        return transfer(args)
+    if args.processes > 1:
+        if args.shard_count is None:
+            parser.error("--processes requires --shard-count")
+        from .sharding import launch_shards
+
+        return launch_shards(args.config, args.shard_count, args.processes)
+
+    from .bot import main
+
+    main(args.config, shard_count=args.shard_count)
+    return 0
+
+
 if __name__ == "__main__":
-    logging.basicConfig(level=logging.INFO)
+    configure_logging()
     logger.info("Launching visual_novel_chat via module execution")
-    main()
+    sys.exit(run())
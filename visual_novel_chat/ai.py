@@ -3,15 +3,18 @@
 from __future__ import annotations
 
 import logging
-from dataclasses import dataclass
-from typing import Callable, Dict, Iterable, List, Optional
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
 try:
     import nltk
 except ModuleNotFoundError:  # pragma: no cover - optional dependency
     nltk = None  # type: ignore[assignment]
 
-from .database import ConversationHistory
+from .cache import RequestCoalescer, ResponseCache, request_key
+from .config import get_setting
+from .database import HistoryStore
 from .ollama import chat as ollama_chat
 
 ChatCallable = Callable[..., object]
@@ -60,6 +63,26 @@ class EmotionClassifier:
             self._pipeline = self._pipeline_factory()
         return self._pipeline
 
+    def memory_bytes(self) -> int:
+        """Return the size of the loaded model's parameters, or 0 if not loaded."""
+
+        model = getattr(self._pipeline, "model", None)
+        if model is None or not hasattr(model, "parameters"):
+            return 0
+        return sum(parameter.numel() * parameter.element_size() for parameter in model.parameters())
+
+    def unload(self) -> int:
+        """Release the pipeline; it is created again on the next prediction.
+
+        Returns the number of bytes released, as estimated by :meth:`memory_bytes`.
+        """
+
+        released = self.memory_bytes()
+        if self._pipeline is not None:
+            logger.info("Unloading emotion model '%s' (%d bytes)", self.model, released)
+            self._pipeline = None
+        return released
+
     def predict(self, text: str) -> Dict[str, float | str]:
         """Return the most likely emotion for *text*."""
 
@@ -76,60 +99,201 @@ class EmotionClassifier:
         return {"label": result["label"], "score": float(result["score"])}
 
 
+@dataclass
+class PromptMetrics:
+    """Token counts and timings reported by Ollama, summed over requests."""
+
+    requests: int = 0
+    prompt_eval_count: int = 0
+    prompt_eval_seconds: float = 0.0
+    eval_count: int = 0
+    eval_seconds: float = 0.0
+
+    def record(self, chat_response: object) -> None:
+        def read(name: str) -> int:
+            value = chat_response.get(name) if isinstance(chat_response, dict) else getattr(chat_response, name, None)
+            return int(value or 0)
+
+        self.requests += 1
+        self.prompt_eval_count += read("prompt_eval_count")
+        self.prompt_eval_seconds += read("prompt_eval_duration") / 1e9
+        self.eval_count += read("eval_count")
+        self.eval_seconds += read("eval_duration") / 1e9
+
+    def as_dict(self) -> Dict[str, float]:
+        metrics = asdict(self)
+        metrics["prompt_requests"] = metrics.pop("requests")
+        return metrics
+
+
 @dataclass
 class AiResponder:
-    """Generate responses for the bot using the Ollama chat API."""
+    """Generate responses for the bot using the Ollama chat API.
+
+    Prompts are laid out so that consecutive turns share as long a prefix as
+    possible, which lets Ollama reuse its KV cache instead of re-evaluating
+    the whole conversation: the stored history is append-only, per-turn
+    context (the ``gwen-data`` scene block and recalled memories) follows the
+    new user message instead of being mixed into it, and the window of
+    *max_messages* slides *prune_chunk* messages at a time. *keep_alive* is
+    passed to Ollama so the model, and its cache, stay loaded between turns.
 
-    history: ConversationHistory
+    Identical in-flight requests (same prior history, user name, location
+    and prompt) share a single model call. A first turn with no recalled
+    memories is sent without the user name, so its reply depends only on the
+    system prompt, location and prompt: such turns coalesce across users and,
+    when *cache* is set, are also served from it, so a raid of new users
+    sending the same message costs one generation.
+
+    Up to *memory_snippets* archived messages relevant to the prompt are
+    recalled from the history store and passed to the model after the new
+    user message, without being stored in the conversation.
+    """
+
+    history: HistoryStore
     model: str = "llama3.2"
     chat_callable: Optional[ChatCallable] = None
+    cache: Optional[ResponseCache] = None
+    coalescer: RequestCoalescer = field(default_factory=RequestCoalescer)
+    memory_snippets: int = 3
+    max_messages: int = 9
+    prune_chunk: int = 4
+    keep_alive: Optional[str] = None
+    prompt_metrics: PromptMetrics = field(default_factory=PromptMetrics)
+    _metrics_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
 
     def __post_init__(self) -> None:
         if self.chat_callable is None:
             logger.debug("No chat callable supplied; using Ollama default implementation")
             self.chat_callable = ollama_chat
 
-    def query(self, prompt: str, user_id: str, user_name: str, config: Dict[str, str]) -> str:
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], history: HistoryStore, **kwargs: Any) -> "AiResponder":
+        """Build a responder from the ``OLLAMA-*`` and ``PROMPT-*`` settings."""
+
+        keep_alive = get_setting(config, "OLLAMA-KEEP-ALIVE", "30m")
+        return cls(
+            history,
+            cache=ResponseCache.from_config(config),
+            max_messages=int(get_setting(config, "PROMPT-WINDOW", 9)),
+            prune_chunk=int(get_setting(config, "PROMPT-PRUNE-CHUNK", 4)),
+            keep_alive=str(keep_alive) if keep_alive not in (None, "") else None,
+            **kwargs,
+        )
+
+    @property
+    def metrics(self) -> Dict[str, int]:
+        """Return cache, coalescing and prompt evaluation counters."""
+
+        metrics = self.cache.metrics.as_dict() if self.cache is not None else {}
+        metrics["coalesced"] = self.coalescer.metrics.coalesced
+        metrics["inflight"] = self.coalescer.inflight
+        metrics.update(self.prompt_metrics.as_dict())
+        return metrics
+
+    def query(
+        self,
+        prompt: str,
+        user_id: str,
+        user_name: str,
+        config: Dict[str, str],
+        guild_id: Optional[str] = None,
+        location: Optional[str] = None,
+    ) -> str:
         """Send *prompt* to the chat model and persist the conversation."""
 
         user_key = str(user_id)
         logger.info("Querying AI responder for user %s", user_key)
+        system_prompt = config.get(
+            "SYSTEM_PROMPT",
+            "You are an anime waifu named Gwen.",
+        )
         conversation = self.history.get_conversation(user_key)
         if not conversation:
-            system_prompt = config.get(
-                "SYSTEM_PROMPT",
-                "You are an anime waifu named Gwen.",
-            )
             logger.debug("Initialising conversation history with system prompt for user %s", user_key)
             self.history.add_message(user_key, "system", system_prompt)
             conversation = self.history.get_conversation(user_key)
+        stateless = len(conversation) == 1
+        context = [msg.__dict__ for msg in conversation]
 
         self.history.add_message(user_key, "user", prompt)
-        self.history.prune_conversation(user_key)
+        self.history.prune_conversation(user_key, self.max_messages, self.prune_chunk)
         conversation = self.history.get_conversation(user_key)
 
-        logger.debug("Sending chat request to model '%s' with %d messages", self.model, len(conversation))
-        chat_response = self.chat_callable(model=self.model, messages=[msg.__dict__ for msg in conversation])
-        response_text = self._extract_content(chat_response)
+        memory = self._recall(user_key, prompt, user_name)
+        shared = stateless and memory is None
+        name = None if shared else user_name
+        cache_key = (conversation[0].content, location, prompt)
+        response_text = None
+        if shared and self.cache is not None:
+            response_text = self.cache.get(guild_id, cache_key)
+        if response_text is None:
+            messages = self._build_messages(conversation, memory, self._state_message(location, name))
+            response_text = self.coalescer.run(
+                request_key(self.model, context + [memory or {}, {"location": location, "user": name, "prompt": prompt}]),
+                lambda: self._chat(messages),
+            )
+            if shared and self.cache is not None:
+                self.cache.put(guild_id, cache_key, response_text)
 
         self.history.add_message(user_key, "assistant", response_text)
-        self.history.prune_conversation(user_key)
+        self.history.prune_conversation(user_key, self.max_messages, self.prune_chunk)
         logger.debug("Stored assistant response for user %s", user_key)
         return response_text
 
+    def _recall(self, user_key: str, prompt: str, user_name: str) -> Optional[dict]:
+        """Return a system message quoting archived messages relevant to *prompt*."""
+
+        if self.memory_snippets <= 0:
+            return None
+        snippets = self.history.search_archive(user_key, prompt, self.memory_snippets)
+        if not snippets:
+            return None
+        logger.debug("Recalled %d archived message(s) for user %s", len(snippets), user_key)
+        lines = [f"- {'you' if msg.role == 'assistant' else user_name}: {msg.content}" for msg in snippets]
+        return {
+            "role": "system",
+            "content": "Earlier parts of your conversation that may be relevant:\n" + "\n".join(lines),
+        }
+
+    @staticmethod
+    def _state_message(location: Optional[str], user_name: Optional[str]) -> Optional[dict]:
+        """Return the ``gwen-data`` block describing the scene for this turn."""
+
+        if location is None:
+            return None
+        user = f", 'current-user': '{user_name}'" if user_name is not None else ""
+        return {
+            "role": "system",
+            "content": f"```gwen-data\n{{'current-location': '{location}'{user}}}\n```",
+        }
+
+    @staticmethod
+    def _build_messages(conversation: List[Any], memory: Optional[dict], state: Optional[dict]) -> List[dict]:
+        """Stored history first, then this turn's context, so the prefix stays cacheable."""
+
+        messages = [msg.__dict__ for msg in conversation]
+        messages.extend(message for message in (memory, state) if message is not None)
+        return messages
+
+    def _chat(self, messages: List[dict]) -> str:
+        logger.debug("Sending chat request to model '%s' with %d messages", self.model, len(messages))
+        options = {"keep_alive": self.keep_alive} if self.keep_alive is not None else {}
+        chat_response = self.chat_callable(model=self.model, messages=messages, **options)
+        with self._metrics_lock:
+            self.prompt_metrics.record(chat_response)
+        return self._extract_content(chat_response)
+
     @staticmethod
     def _extract_content(chat_response: object) -> str:
         """Extract the assistant text content from *chat_response*."""
 
         if isinstance(chat_response, str):
-            logger.debug("Chat response received as raw string")
             return chat_response
         if hasattr(chat_response, "message") and hasattr(chat_response.message, "content"):
-            logger.debug("Chat response received as object with message.content")
             return chat_response.message.content
         if isinstance(chat_response, dict) and "message" in chat_response:
             message = chat_response["message"]
             if isinstance(message, dict) and "content" in message:
-                logger.debug("Chat response received as dictionary with nested content")
                 return message["content"]
         raise TypeError("Unable to extract assistant response from chat response")
@@ -0,0 +1,210 @@
+"""Decoded image assets shared between processes without copying."""
+
+from __future__ import annotations
+
+import logging
+import secrets
+import sys
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Image key used by VisualNovel -> path relative to the assets root.
+ASSET_FILES: Dict[str, Tuple[str, ...]] = {
+    "empty": ("ui_elements", "blank.png"),
+    "love": ("sprites", "smile.png"),
+    "joy": ("sprites", "delighted.png"),
+    "anger": ("sprites", "angry.png"),
+    "surprise": ("sprites", "shocked.png"),
+    "sadness": ("sprites", "sad.png"),
+    "fear": ("sprites", "shocked.png"),
+    "menu": ("ui_elements", "overlay_menu.png"),
+    "map": ("ui_elements", "overlay_map.png"),
+    "about": ("ui_elements", "overlay_about.png"),
+    "chat": ("ui_elements", "overlay_chat.png"),
+    "bridge": ("backgrounds", "bridge.png"),
+    "swing": ("backgrounds", "swing.png"),
+    "grove": ("backgrounds", "grove.png"),
+    "path": ("backgrounds", "path.png"),
+}
+
+SHARED_MODE = "RGBA"
+
+
+class _SharedBlock(shared_memory.SharedMemory):
+    """SharedMemory that tolerates images outliving it at interpreter exit."""
+
+    def __del__(self) -> None:
+        try:
+            self.close()
+        except (BufferError, OSError):
+            pass
+
+
+def load_asset_images(assets_root: Path, files: Optional[Dict[str, Tuple[str, ...]]] = None) -> Dict[str, Image.Image]:
+    """Open every asset in *files* from disk; pixels are decoded on first use."""
+
+    return {key: Image.open(Path(assets_root).joinpath(*parts)) for key, parts in (files or ASSET_FILES).items()}
+
+
+@dataclass(frozen=True)
+class AssetEntry:
+    """Location of one decoded image inside the shared block."""
+
+    mode: str
+    width: int
+    height: int
+    offset: int
+    length: int
+
+
+@dataclass(frozen=True)
+class AssetManifest:
+    """Everything a worker needs to attach to published assets.
+
+    The manifest is small and picklable, so it can be handed to spawned
+    processes as an argument.
+    """
+
+    name: str
+    size: int
+    entries: Dict[str, AssetEntry]
+
+
+class SharedAssets:
+    """Decoded RGBA assets stored once in a :mod:`multiprocessing.shared_memory` block.
+
+    The parent calls :meth:`publish`, which decodes each file once (keys that
+    share a file share its pixels) and packs the raw buffers back to back.
+    Workers call :meth:`attach` with the manifest; :meth:`images` wraps the
+    block with :func:`PIL.Image.frombuffer`, so no pixels are copied and every
+    process maps the same physical pages. The images are read-only; callers
+    that draw must ``copy()`` first, which ``VisualNovel`` already does.
+    """
+
+    def __init__(self, shm: _SharedBlock, manifest: AssetManifest, owner: bool) -> None:
+        self._shm = shm
+        self.manifest = manifest
+        self.owner = owner
+        self._images: Optional[Dict[str, Image.Image]] = None
+
+    @classmethod
+    def publish(
+        cls,
+        assets_root: Path,
+        files: Optional[Dict[str, Tuple[str, ...]]] = None,
+    ) -> "SharedAssets":
+        """Decode *files* under *assets_root* into a new shared memory block."""
+
+        decoded: Dict[Tuple[str, ...], Image.Image] = {}
+        for parts in (files or ASSET_FILES).values():
+            if parts not in decoded:
+                with Image.open(Path(assets_root).joinpath(*parts)) as image:
+                    decoded[parts] = image.convert(SHARED_MODE)
+
+        layout: Dict[Tuple[str, ...], AssetEntry] = {}
+        offset = 0
+        for parts, image in decoded.items():
+            length = image.width * image.height * len(SHARED_MODE)
+            layout[parts] = AssetEntry(SHARED_MODE, image.width, image.height, offset, length)
+            offset += length
+
+        name = f"vn-assets-{secrets.token_hex(6)}"
+        shm = _SharedBlock(name=name, create=True, size=max(offset, 1))
+        for parts, image in decoded.items():
+            entry = layout[parts]
+            shm.buf[entry.offset : entry.offset + entry.length] = image.tobytes("raw", SHARED_MODE)
+            image.close()
+
+        entries = {key: layout[parts] for key, parts in (files or ASSET_FILES).items()}
+        manifest = AssetManifest(name=shm.name, size=offset, entries=entries)
+        logger.info(
+            "Published %d decoded assets (%d files, %.1f MiB) as shared memory %s",
+            len(entries),
+            len(decoded),
+            offset / 2**20,
+            shm.name,
+        )
+        return cls(shm, manifest, owner=True)
+
+    @classmethod
+    def attach(cls, manifest: AssetManifest) -> "SharedAssets":
+        """Attach to assets published by another process."""
+
+        return cls(_SharedBlock(name=manifest.name), manifest, owner=False)
+
+    def images(self) -> Dict[str, Image.Image]:
+        """Return read-only images that view the shared block directly."""
+
+        if self._images is None:
+            self._images = {}
+            for key, entry in self.manifest.entries.items():
+                view = self._shm.buf[entry.offset : entry.offset + entry.length]
+                self._images[key] = Image.frombuffer(
+                    entry.mode, (entry.width, entry.height), view, "raw", entry.mode, 0, 1
+                )
+        return dict(self._images)
+
+    def close(self) -> None:
+        """Detach from the block, and remove it if this process published it.
+
+        The mapping stays alive while images returned by :meth:`images` are
+        still referenced; it is released once they are garbage collected.
+        """
+
+        self._images = None
+        try:
+            self._shm.close()
+        except BufferError:
+            logger.debug("Shared assets %s still referenced; leaving mapping open", self.manifest.name)
+        if self.owner:
+            self._shm.unlink()
+            self.owner = False
+
+    def __enter__(self) -> "SharedAssets":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def memory_usage() -> Dict[str, int]:
+    """Return this process's resident memory in bytes.
+
+    On Linux ``rss`` counts every mapped page the process touched, including
+    pages shared with other workers, so ``pss`` (shared pages divided among
+    the processes mapping them) and ``private`` are the better measure of
+    what one worker really costs. Elsewhere only the peak RSS since start-up
+    is available, reported as ``maxrss``.
+    """
+
+    fields = {"Rss": "rss", "Pss": "pss", "Private_Clean": "private", "Private_Dirty": "private"}
+    usage: Dict[str, int] = {}
+    try:
+        with open("/proc/self/smaps_rollup", encoding="ascii") as rollup:
+            for line in rollup:
+                key, _, value = line.partition(":")
+                if key in fields:
+                    name = fields[key]
+                    usage[name] = usage.get(name, 0) + int(value.split()[0]) * 1024
+    except OSError:
+        import resource  # POSIX only; Windows has neither this nor smaps
+
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        usage = {"maxrss": maxrss if sys.platform == "darwin" else maxrss * 1024}
+    return usage
+
+
+__all__ = [
+    "ASSET_FILES",
+    "AssetEntry",
+    "AssetManifest",
+    "SharedAssets",
+    "load_asset_images",
+    "memory_usage",
+]
@@ -2,92 +2,246 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 import re
-from typing import Optional
+from typing import List, Optional
 
 import discord
 from discord.ext import commands
 
 from .ai import AiResponder, EmotionClassifier, ensure_nltk_data
-from .config import load_config
+from .assets import AssetManifest, SharedAssets, memory_usage
+from .config import get_setting, load_config
 from .constants import DEFAULT_DB_PATH
-from .database import ConversationHistory
+from .database import ConversationHistory, HistoryStore
+from .degradation import REDUCED_FRAME, REUSE_MOOD, TEXT_ONLY, DegradationController
+from .encoding import FrameEncoder
+from .lexicon import CascadeClassifier
+from .log import request_context
+from .memory import MemoryAccountant, image_bytes, serve_memory_endpoint
+from .profiling import Profiler
+from .scheduler import FairScheduler, SchedulerBusy
 from .visual_novel import VisualNovel
 
 logger = logging.getLogger(__name__)
 
+MESSAGE_LIMIT = 2000
+EMPTY_REPLY = "Gwen doesn't know what to say."
+
 
 def create_bot(
     config: dict,
-    history: Optional[ConversationHistory] = None,
+    history: Optional[HistoryStore] = None,
     responder: Optional[AiResponder] = None,
-    classifier: Optional[EmotionClassifier] = None,
+    classifier: Optional[EmotionClassifier | CascadeClassifier] = None,
+    profiler: Optional[Profiler] = None,
+    scheduler: Optional[FairScheduler] = None,
+    shard_ids: Optional[List[int]] = None,
+    shard_count: Optional[int] = None,
+    assets: Optional[SharedAssets] = None,
+    accountant: Optional[MemoryAccountant] = None,
+    degradation: Optional[DegradationController] = None,
 ) -> commands.Bot:
-    """Create and configure the Discord bot instance."""
+    """Create and configure the Discord bot instance.
+
+    When *shard_count* is given an :class:`~discord.ext.commands.AutoShardedBot`
+    is created that connects only *shard_ids* (all shards if omitted). Discord
+    delivers every event for a guild, including its button interactions, to
+    the shard owning it, so per-guild session state stays in one process.
+    Processes started by the shard launcher pass *assets* so they render from
+    the images the launcher decoded once into shared memory.
+
+    Memory held by the response and scene caches, the emotion model, image
+    assets and session state is tracked by *accountant*; when
+    ``MEMORY-BUDGET-MB`` is set, the caches and then the emotion model are
+    evicted to stay within it after every ``!gwen`` and button press.
+
+    Under load, *degradation* lowers the quality of ``!gwen`` replies as the
+    scheduler queue or event-loop lag grows: first the previous mood is
+    reused instead of running the emotion classifier, then a cached, half
+    resolution frame is sent, and finally a text-only reply. Button presses
+    re-evaluate the tier and send reduced frames from the same point.
+    """
 
     history = history or ConversationHistory(DEFAULT_DB_PATH)
-    responder = responder or AiResponder(history)
-    classifier = classifier or EmotionClassifier()
+    responder = responder or AiResponder.from_config(config, history)
+    classifier = classifier or CascadeClassifier.from_config(config, EmotionClassifier())
+    profiler = profiler or Profiler.from_config(config)
+    scheduler = scheduler or FairScheduler.from_config(config)
+    degradation = degradation or DegradationController.from_config(config)
 
     logger.info("Creating Discord bot with prefix '!' and intents for message content")
 
     intents = discord.Intents.default()
     intents.message_content = True
-    bot = commands.Bot(command_prefix="!", intents=intents)
-
-    visual_novel = VisualNovel(config)
-    visual_novel.load_images()
-    logger.debug("Visual novel assets loaded during bot initialisation")
+    if shard_count is not None:
+        logger.info("Using AutoShardedBot for shards %s of %d", shard_ids or "all", shard_count)
+        bot = commands.AutoShardedBot(
+            command_prefix="!",
+            intents=intents,
+            shard_ids=shard_ids,
+            shard_count=shard_count,
+        )
+    else:
+        bot = commands.Bot(command_prefix="!", intents=intents)
+
+    accountant = accountant or MemoryAccountant.from_config(config)
+    visual_novel = VisualNovel(
+        config,
+        profiler=profiler,
+        encoder=FrameEncoder.from_config(config),
+        after_callback=accountant.enforce,
+        reduce_frames=lambda: degradation.update(sum(scheduler.queue_depths().values())) >= REDUCED_FRAME,
+    )
+    before = memory_usage()
+    visual_novel.load_images(assets)
+    logger.info(
+        "Visual novel assets loaded (%s); memory before %s, after %s",
+        "shared" if assets is not None else "from disk",
+        _format_memory(before),
+        _format_memory(memory_usage()),
+    )
+
+    if responder.cache is not None:
+        accountant.register("response_cache", lambda: responder.cache.nbytes, responder.cache.evict, priority=0)
+    model = classifier.model if isinstance(classifier, CascadeClassifier) else classifier
+    if hasattr(model, "memory_bytes"):
+        accountant.register("emotion_model", model.memory_bytes, lambda _: model.unload(), priority=10)
+    accountant.register("assets", lambda: image_bytes(visual_novel.images.values()))
+    accountant.register("session", visual_novel.session_bytes)
+    accountant.register("scene_cache", visual_novel.scene_cache_bytes, visual_novel.evict_scenes, priority=0)
+    memory_port = int(get_setting(config, "MEMORY-PORT", 0))
+    memory_endpoint = []
+    background_tasks = []
 
     @bot.event
     async def on_ready() -> None:
         logger.info("Discord bot ready as %s", bot.user)
         visual_novel.load_views()
         logger.debug("Discord UI views prepared")
+        if memory_port and not memory_endpoint:
+            # Each shard process listens on its own port next to the base one.
+            port = memory_port + (shard_ids[0] if shard_ids else 0)
+            memory_endpoint.append(serve_memory_endpoint(accountant, port))
+        if not background_tasks:
+            background_tasks.append(asyncio.create_task(degradation.monitor()))
 
     @bot.command()
     async def gwen(ctx) -> None:
+        with request_context("gwen"), profiler.profile("gwen"):
+            try:
+                await _gwen(ctx)
+            finally:
+                accountant.enforce()
+
+    async def _gwen(ctx) -> None:
         logger.info("Received !gwen command from user %s", ctx.message.author.id)
         visual_novel.state = 0
         query = re.sub(r"!gwen\s+", "", ctx.message.content)
-        waifu_location = (
-            "```gwen-data\n\n"
-            f"{{'current-location': '{visual_novel.current_location}', 'current-user' : {ctx.message.author.name}\n}}```"
-        )
-        response = responder.query(waifu_location + query, ctx.message.author.id, ctx.message.author.name, config)
-        prediction = classifier.predict(response)
-
-        if prediction["score"] > 0.5:
-            visual_novel.waifu_mood = prediction["label"]
-        else:
-            visual_novel.waifu_mood = "love"
-
-        logger.debug("Predicted emotion %s with score %.3f", prediction["label"], prediction["score"])
+        guild_id = str(ctx.guild.id) if ctx.guild else None
+        try:
+            response = await scheduler.submit(
+                guild_id,
+                ctx.message.author.id,
+                profiler.bind(responder.query),
+                query,
+                ctx.message.author.id,
+                ctx.message.author.name,
+                config,
+                guild_id=guild_id,
+                location=visual_novel.current_location,
+                coalesce_key=(ctx.message.author.name, visual_novel.current_location, query),
+            )
+        except SchedulerBusy as exc:
+            logger.info("Rejected !gwen from user %s: %s", ctx.message.author.id, exc.reason)
+            await ctx.send("Gwen is busy right now, please try again in a moment.")
+            return
+        tier = degradation.update(sum(scheduler.queue_depths().values()))
+        if tier >= TEXT_ONLY:
+            await ctx.send(response.strip()[:MESSAGE_LIMIT] or EMPTY_REPLY)
+            logger.info("Sent text-only response to user %s", ctx.message.author.id)
+            return
+        if tier < REUSE_MOOD:
+            prediction = classifier.predict(response)
+            if prediction["score"] > 0.5:
+                visual_novel.waifu_mood = prediction["label"]
+            else:
+                visual_novel.waifu_mood = "love"
+            logger.debug("Predicted emotion %s with score %.3f", prediction["label"], prediction["score"])
 
         visual_novel.update_waifu_stats()
 
         pages = visual_novel.prepare_chat_pages(response)
         visual_novel.state = 4 if len(pages) > 1 else 0
-        await visual_novel.render_waifu_chat()
+        await visual_novel.render_waifu_chat(reduced=tier >= REDUCED_FRAME)
 
         await ctx.send(
-            file=discord.File(str(visual_novel.output_file)),
+            file=visual_novel.frame_file(),
             view=visual_novel.views[visual_novel.state],
         )
 
         logger.info("Sent response to user %s with %d page(s)", ctx.message.author.id, len(pages))
 
+    @bot.command(name="profile")
+    @commands.is_owner()
+    async def profile_command(ctx, rate: Optional[float] = None) -> None:
+        if rate is not None:
+            try:
+                profiler.set_sample_rate(rate)
+            except ValueError as exc:
+                await ctx.send(str(exc))
+                return
+            logger.info("Profiling sample rate set to %.3f by %s", rate, ctx.message.author.id)
+        await ctx.send(
+            f"Profiling {profiler.sample_rate:.1%} of handlers ({profiler.mode}) into {profiler.output_dir}"
+        )
+
+    @bot.command(name="stats")
+    @commands.is_owner()
+    async def stats_command(ctx) -> None:
+        metrics = {**responder.metrics, **scheduler.metrics.as_dict()}
+        metrics["queue_depths"] = scheduler.queue_depths()
+        metrics["encoding"] = visual_novel.encoder.metrics()
+        metrics["memory"] = _format_memory(memory_usage())
+        metrics.update(degradation.as_dict())
+        if isinstance(classifier, CascadeClassifier):
+            metrics.update(classifier.metrics.as_dict())
+        await ctx.send("\n".join(f"{name}: {value}" for name, value in sorted(metrics.items())))
+
+    @bot.command(name="memory")
+    @commands.is_owner()
+    async def memory_command(ctx) -> None:
+        report = accountant.report()
+        lines = [f"{name}: {value / 2**20:.1f} MiB" for name, value in sorted(report["categories"].items())]
+        budget = "none" if report["budget"] is None else f"{report['budget'] / 2**20:.0f} MiB"
+        lines.append(f"accounted: {report['accounted'] / 2**20:.1f} MiB of budget {budget}")
+        lines.append(f"process: {_format_memory(report['process'])}")
+        lines.append(f"evictions: {report['evictions']} ({report['evicted_bytes'] / 2**20:.1f} MiB)")
+        for module, size in report.get("traced", {}).get("modules", {}).items():
+            lines.append(f"traced {module}: {size / 2**20:.1f} MiB")
+        await ctx.send("\n".join(lines))
+
     return bot
 
 
-def main(config_path: str = "waifu_config.json") -> None:
+def _format_memory(usage: dict) -> str:
+    return ", ".join(f"{name} {value / 2**20:.1f} MiB" for name, value in usage.items())
+
+
+def main(
+    config_path: str = "waifu_config.json",
+    shard_ids: Optional[List[int]] = None,
+    shard_count: Optional[int] = None,
+    asset_manifest: Optional[AssetManifest] = None,
+) -> None:
     """Entry point used by the command line and Docker image."""
 
     config = load_config(config_path)
     ensure_nltk_data()
-    bot = create_bot(config)
+    assets = SharedAssets.attach(asset_manifest) if asset_manifest is not None else None
+    bot = create_bot(config, shard_ids=shard_ids, shard_count=shard_count, assets=assets)
     bot_token = os.getenv("BOT_TOKEN", config.get("BOT-TOKEN"))
     if not bot_token:
         raise KeyError("BOT-TOKEN missing from configuration and BOT_TOKEN env var not set")
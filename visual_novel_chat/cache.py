@@ -0,0 +1,196 @@
+"""Response caching and request coalescing for the chat model."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from .config import get_setting
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CacheKey = Tuple[str, Optional[str], str]
+
+# Rough per-entry cost of the OrderedDict node and the entry/key tuples.
+ENTRY_OVERHEAD = 200
+
+
+def request_key(model: str, messages: list[dict]) -> str:
+    """Return a stable hash of the model and the full message list."""
+
+    payload = json.dumps([model, messages], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheMetrics:
+    """Counters describing cache and coalescing effectiveness."""
+
+    hits: int = 0
+    misses: int = 0
+    expirations: int = 0
+    evictions: int = 0
+    coalesced: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class ResponseCache:
+    """Short-lived cache of ``(system prompt, location, prompt)`` → response.
+
+    Entries are partitioned per guild and each partition holds at most
+    *max_entries_per_guild* responses, evicted in least-recently-used order, so
+    one busy guild cannot push out everyone else's entries. The approximate
+    size of all entries is tracked in :attr:`nbytes` so that a memory budget
+    can shrink the cache with :meth:`evict`.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        max_entries_per_guild: int = 128,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if ttl <= 0:
+            raise ValueError("ttl must be positive")
+        if max_entries_per_guild <= 0:
+            raise ValueError("max_entries_per_guild must be positive")
+        self.ttl = ttl
+        self.max_entries_per_guild = max_entries_per_guild
+        self.metrics = CacheMetrics()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._partitions: Dict[Optional[str], OrderedDict[CacheKey, Tuple[float, str, int]]] = {}
+        self._bytes = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["ResponseCache"]:
+        """Build a cache from ``RESPONSE-CACHE-*`` settings, or ``None`` if disabled."""
+
+        ttl = float(get_setting(config, "RESPONSE-CACHE-TTL", 0))
+        if ttl <= 0:
+            return None
+        size = int(get_setting(config, "RESPONSE-CACHE-SIZE", 128))
+        logger.info("Response cache enabled with ttl=%.0fs and %d entries per guild", ttl, size)
+        return cls(ttl=ttl, max_entries_per_guild=size)
+
+    def get(self, guild_id: Optional[str], key: CacheKey) -> Optional[str]:
+        with self._lock:
+            partition = self._partitions.get(guild_id)
+            entry = partition.get(key) if partition is not None else None
+            if entry is None:
+                self.metrics.misses += 1
+                return None
+            expires_at, value, size = entry
+            if expires_at <= self._clock():
+                del partition[key]
+                self._bytes -= size
+                self.metrics.expirations += 1
+                self.metrics.misses += 1
+                return None
+            partition.move_to_end(key)
+            self.metrics.hits += 1
+            return value
+
+    def put(self, guild_id: Optional[str], key: CacheKey, value: str) -> None:
+        size = ENTRY_OVERHEAD + sys.getsizeof(value) + sum(sys.getsizeof(part) for part in key)
+        with self._lock:
+            partition = self._partitions.setdefault(guild_id, OrderedDict())
+            previous = partition.get(key)
+            if previous is not None:
+                self._bytes -= previous[2]
+            partition[key] = (self._clock() + self.ttl, value, size)
+            self._bytes += size
+            partition.move_to_end(key)
+            while len(partition) > self.max_entries_per_guild:
+                self._bytes -= partition.popitem(last=False)[1][2]
+                self.metrics.evictions += 1
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by cached entries."""
+
+        return self._bytes
+
+    def evict(self, nbytes: int) -> int:
+        """Drop the oldest entries across all guilds until *nbytes* are freed.
+
+        Returns the number of bytes actually freed.
+        """
+
+        freed = 0
+        with self._lock:
+            while freed < nbytes:
+                oldest = None
+                for guild_id, partition in self._partitions.items():
+                    if partition:
+                        expires_at = next(iter(partition.values()))[0]
+                        if oldest is None or expires_at < oldest[0]:
+                            oldest = (expires_at, guild_id)
+                if oldest is None:
+                    break
+                freed += self._partitions[oldest[1]].popitem(last=False)[1][2]
+                self.metrics.evictions += 1
+            self._bytes -= freed
+        return freed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(partition) for partition in self._partitions.values())
+
+
+class RequestCoalescer:
+    """Share one execution between identical concurrent calls.
+
+    The first caller for a key runs the function; callers arriving with the
+    same key while it is in flight block on its result instead of issuing their
+    own request. Exceptions are propagated to every waiter.
+    """
+
+    def __init__(self, metrics: Optional[CacheMetrics] = None) -> None:
+        self.metrics = metrics or CacheMetrics()
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+
+    def run(self, key: Hashable, func: Callable[[], T]) -> T:
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.metrics.coalesced += 1
+        if not leader:
+            logger.debug("Coalescing request with in-flight key %s", key)
+            return future.result()
+        try:
+            result = func()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    @property
+    def inflight(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+
+__all__ = ["CacheMetrics", "RequestCoalescer", "ResponseCache", "request_key"]
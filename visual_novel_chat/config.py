@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import json
 import logging
+import os
 from pathlib import Path
 from typing import Any, Dict
 
@@ -28,5 +29,16 @@ def load_config(path: str | Path = DEFAULT_CONFIG_PATH) -> Dict[str, Any]:
         raise FileNotFoundError(f"Configuration file not found: {config_path}")
     with config_path.open("r", encoding="utf-8") as config_file:
         config = json.load(config_file)
-    logger.debug("Configuration loaded with keys: %s", sorted(config.keys()))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Configuration loaded with keys: %s", sorted(config.keys()))
     return config
+
+
+def get_setting(config: Dict[str, Any], key: str, default: Any = None) -> Any:
+    """Return *key* from *config*, letting the matching env var take precedence.
+
+    The environment variable name is *key* with hyphens replaced by
+    underscores, mirroring how ``BOT_TOKEN`` overrides ``BOT-TOKEN``.
+    """
+
+    return os.getenv(key.replace("-", "_"), config.get(key, default))
@@ -15,4 +15,3 @@ CONST_POSITION = {
 
 DEFAULT_DB_PATH = "chat_history.db"
 
-logger.debug("Constants module loaded with positions: %s", CONST_POSITION)
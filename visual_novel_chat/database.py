@@ -3,16 +3,58 @@
 from __future__ import annotations
 
 import logging
+import math
+import queue
+import re
 import sqlite3
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Protocol, Sequence, runtime_checkable
 
 from .constants import DEFAULT_DB_PATH
+from .text_utils import extract_terms
 
 
 logger = logging.getLogger(__name__)
 
+EXPORT_TABLES = ("conversation", "archive")
+_TABLE_NAMES = {"conversation": "conversation", "archive": "conversation_archive"}
+MAX_SEARCH_TERMS = 16
+MAX_SEARCH_CANDIDATES = 200
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _user_token(user_id: str) -> str:
+    """Return the single FTS token identifying *user_id* (see the archive trigger)."""
+
+    return "u" + str(user_id).encode("utf-8").hex()
+
+
+def _rank_bm25(documents: List[str], terms: List[str], limit: int, k1: float = 1.2, b: float = 0.75) -> List[int]:
+    """Return the indices of the *limit* best *documents* for *terms* under BM25.
+
+    Ties keep the input order, which callers use to prefer recent messages.
+    """
+
+    tokenized = [_TOKEN_PATTERN.findall(document.lower()) for document in documents]
+    average_length = sum(map(len, tokenized)) / max(len(tokenized), 1) or 1.0
+    frequencies = {term: sum(term in tokens for tokens in tokenized) for term in terms}
+    idf = {
+        term: math.log(1 + (len(tokenized) - df + 0.5) / (df + 0.5))
+        for term, df in frequencies.items()
+    }
+    scores = []
+    for index, tokens in enumerate(tokenized):
+        norm = k1 * (1 - b + b * len(tokens) / average_length)
+        score = 0.0
+        for term in terms:
+            tf = tokens.count(term)
+            if tf:
+                score += idf[term] * tf * (k1 + 1) / (tf + norm)
+        scores.append((-score, index))
+    return [index for _, index in sorted(scores)[:limit]]
+
 
 @dataclass
 class ConversationMessage:
@@ -22,23 +64,65 @@ class ConversationMessage:
     content: str
 
 
+@runtime_checkable
+class HistoryStore(Protocol):
+    """Interface for conversation storage shared by bot processes."""
+
+    def add_message(self, user_id: str, role: str, content: str) -> None: ...
+
+    def get_conversation(self, user_id: str) -> List[ConversationMessage]: ...
+
+    def prune_conversation(self, user_id: str, max_messages: int = 9, chunk: int = 1) -> None: ...
+
+    def add_messages(self, user_id: str, messages: Iterable[ConversationMessage]) -> None: ...
+
+    def search_archive(self, user_id: str, query: str, limit: int = 3) -> List[ConversationMessage]: ...
+
+    def clear(self) -> None: ...
+
+
 class ConversationHistory:
-    """Persist and retrieve Discord conversation history using SQLite."""
+    """Persist and retrieve Discord conversation history using SQLite.
+
+    The database runs in WAL mode with a busy timeout so that several bot
+    processes (one per shard range) can share the same file: readers never
+    block, and concurrent writers wait for each other instead of failing.
 
-    def __init__(self, db_path: str | Path = DEFAULT_DB_PATH) -> None:
+    Messages removed by :meth:`prune_conversation` are moved to an archive
+    table with an FTS5 index, kept up to date by a trigger, so
+    :meth:`search_archive` can recall relevant older messages. Each user is
+    indexed as a single rare token, which keeps lookups proportional to that
+    user's archive rather than to the whole table.
+    """
+
+    def __init__(self, db_path: str | Path = DEFAULT_DB_PATH, busy_timeout: float = 30.0) -> None:
         self.db_path = Path(db_path)
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
         self._init_db()
         logger.debug("ConversationHistory initialised with database at %s", self.db_path)
 
     # -- Database primitives -------------------------------------------------
 
     def _connect(self) -> sqlite3.Connection:
-        logger.debug("Opening SQLite connection to %s", self.db_path)
-        return sqlite3.connect(self.db_path)
+        return sqlite3.connect(self.db_path, timeout=self.busy_timeout)
+
+    def _reader(self) -> sqlite3.Connection:
+        """Return this thread's long-lived connection for latency-sensitive reads.
+
+        Reusing the connection skips re-parsing the schema on every lookup; in
+        WAL mode each statement still sees the latest committed data.
+        """
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
 
     def _init_db(self) -> None:
         with self._connect() as conn:
             cursor = conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
             cursor.execute(
                 """
                 CREATE TABLE IF NOT EXISTS conversation (
@@ -50,9 +134,54 @@ class ConversationHistory:
                 )
                 """
             )
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS conversation_archive (
+                    id INTEGER PRIMARY KEY,
+                    user_id TEXT,
+                    role TEXT,
+                    content TEXT,
+                    timestamp DATETIME
+                )
+                """
+            )
+            self.search_enabled = self._init_search_index(cursor)
             conn.commit()
         logger.debug("Conversation table ensured for database %s", self.db_path)
 
+    @staticmethod
+    def _init_search_index(cursor: sqlite3.Cursor) -> bool:
+        try:
+            cursor.execute(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS conversation_archive_fts USING fts5(
+                    user_key, content, content='conversation_archive', content_rowid='id'
+                )
+                """
+            )
+        except sqlite3.OperationalError as exc:
+            logger.warning("SQLite FTS5 unavailable; archive search disabled: %s", exc)
+            return False
+        cursor.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS conversation_archive_ai AFTER INSERT ON conversation_archive
+            BEGIN
+                INSERT INTO conversation_archive_fts (rowid, user_key, content)
+                VALUES (new.id, 'u' || lower(hex(new.user_id)), new.content);
+            END
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS conversation_archive_ad AFTER DELETE ON conversation_archive
+            BEGIN
+                INSERT INTO conversation_archive_fts (conversation_archive_fts, rowid, user_key, content)
+                VALUES ('delete', old.id, 'u' || lower(hex(old.user_id)), old.content);
+            END
+            """
+        )
+        return True
+
     # -- Public API ----------------------------------------------------------
 
     def add_message(self, user_id: str, role: str, content: str) -> None:
@@ -84,12 +213,14 @@ class ConversationHistory:
         logger.debug("Retrieved %d conversation messages for user %s", len(messages), user_id)
         return messages
 
-    def prune_conversation(self, user_id: str, max_messages: int = 9) -> None:
+    def prune_conversation(self, user_id: str, max_messages: int = 9, chunk: int = 1) -> None:
         """Limit the conversation to *max_messages* entries.
 
         The first message (expected to be the system prompt) is always retained
         while the remaining messages are trimmed from the beginning of the
-        conversation.
+        conversation. Once the limit is exceeded, *chunk* messages' worth of
+        room is freed at once, so the start of the conversation (and with it
+        the model's cached prompt prefix) only changes every *chunk* messages.
         """
 
         with self._connect() as conn:
@@ -104,9 +235,17 @@ class ConversationHistory:
             )
             rows = cursor.fetchall()
             if len(rows) > max_messages:
-                ids_to_keep = {rows[0][0]} | {row[0] for row in rows[-(max_messages - 1) :]}
+                keep = max(max_messages - max(chunk, 1), 0)
+                ids_to_keep = {rows[0][0]} | {row[0] for row in rows[len(rows) - keep :]}
                 ids_to_delete = [row_id for (row_id,) in rows if row_id not in ids_to_keep]
                 if ids_to_delete:
+                    cursor.executemany(
+                        """
+                        INSERT OR IGNORE INTO conversation_archive (id, user_id, role, content, timestamp)
+                        SELECT id, user_id, role, content, timestamp FROM conversation WHERE id = ?
+                        """,
+                        [(row_id,) for row_id in ids_to_delete],
+                    )
                     cursor.executemany(
                         "DELETE FROM conversation WHERE id = ?",
                         [(row_id,) for row_id in ids_to_delete],
@@ -122,9 +261,189 @@ class ConversationHistory:
             self.add_message(user_id, message.role, message.content)
         logger.debug("Bulk stored %d messages for user %s", len(message_list), user_id)
 
+    def search_archive(self, user_id: str, query: str, limit: int = 3) -> List[ConversationMessage]:
+        """Return up to *limit* archived messages of *user_id* most relevant to *query*.
+
+        FTS5 selects the user's most recent messages sharing a word with
+        *query*; those candidates are ranked in process with BM25. SQLite's
+        own ``bm25()`` is avoided because it gathers statistics across every
+        user's messages. Stopwords and words shorter than three characters are
+        ignored.
+        """
+
+        terms = extract_terms(query)[:MAX_SEARCH_TERMS]
+        if not self.search_enabled or not terms or limit <= 0:
+            return []
+        content_terms = " OR ".join(f'"{term}"' for term in terms)
+        match = f'user_key : "{_user_token(user_id)}" AND content : ({content_terms})'
+        cursor = self._reader().cursor()
+        cursor.execute(
+            """
+            SELECT archive.role, archive.content
+            FROM conversation_archive_fts
+            JOIN conversation_archive AS archive ON archive.id = conversation_archive_fts.rowid
+            WHERE conversation_archive_fts MATCH ?
+            ORDER BY conversation_archive_fts.rowid DESC
+            LIMIT ?
+            """,
+            (match, MAX_SEARCH_CANDIDATES),
+        )
+        rows = cursor.fetchall()
+        ranked = _rank_bm25([row[1] for row in rows], terms, limit)
+        return [ConversationMessage(role=rows[index][0], content=rows[index][1]) for index in ranked]
+
+    def export_rows(
+        self,
+        tables: Sequence[str] = EXPORT_TABLES,
+        user_ids: Optional[Sequence[str]] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        batch_size: int = 10_000,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield stored messages as dictionaries, oldest first per table.
+
+        Rows are read in pages of *batch_size* by primary key, each page in
+        its own short read transaction, so memory stays constant and the bot
+        can keep writing while a large export runs. *since* and *until* are
+        compared with the stored ``YYYY-MM-DD HH:MM:SS`` timestamps (*until*
+        is exclusive).
+        """
+
+        conditions = ["id > ?"]
+        filters: List[Any] = []
+        if user_ids:
+            conditions.append(f"user_id IN ({', '.join('?' * len(user_ids))})")
+            filters.extend(str(user_id) for user_id in user_ids)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            filters.append(since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            filters.append(until)
+        where = " AND ".join(conditions)
+
+        conn = self._connect()
+        try:
+            for table in tables:
+                query = (
+                    f"SELECT id, user_id, role, content, timestamp FROM {_TABLE_NAMES[table]} "
+                    f"WHERE {where} ORDER BY id LIMIT ?"
+                )
+                last_id = 0
+                while True:
+                    rows = conn.execute(query, (last_id, *filters, batch_size)).fetchall()
+                    for _, user_id, role, content, timestamp in rows:
+                        yield {"table": table, "user_id": user_id, "role": role, "content": content, "timestamp": timestamp}
+                    if len(rows) < batch_size:
+                        break
+                    last_id = rows[-1][0]
+        finally:
+            conn.close()
+
+    def import_rows(self, rows: Iterable[Dict[str, Any]], batch_size: int = 50_000) -> int:
+        """Append *rows* as produced by :meth:`export_rows`; return how many were stored.
+
+        Rows are inserted with ``executemany`` and committed every
+        *batch_size* rows, so an interrupted import keeps the batches already
+        written. Imported rows get new ids after the existing ones; file order
+        is preserved, which keeps each conversation in order.
+        """
+
+        if batch_size <= 0:
+            raise ValueError("batch_size must be positive")
+        insert_conversation = (
+            "INSERT INTO conversation (user_id, role, content, timestamp) "
+            "VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))"
+        )
+        insert_archive = (
+            "INSERT INTO conversation_archive (id, user_id, role, content, timestamp) "
+            "VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))"
+        )
+        batches: "queue.Queue[Optional[Dict[str, List[tuple]]]]" = queue.Queue(maxsize=2)
+        failure: List[BaseException] = []
+
+        def write() -> None:
+            # Runs in its own thread: sqlite3 releases the GIL while stepping,
+            # so inserts overlap with the caller parsing the next batch.
+            conn = self._connect()
+            try:
+                conn.execute("PRAGMA synchronous=NORMAL")
+                while True:
+                    pending = batches.get()
+                    if pending is None:
+                        return
+                    if failure:
+                        continue
+                    with conn:
+                        if pending["conversation"]:
+                            conn.executemany(insert_conversation, pending["conversation"])
+                        if pending["archive"]:
+                            base = self._reserve_ids(conn, len(pending["archive"]))
+                            conn.executemany(
+                                insert_archive,
+                                ((base + offset, *values) for offset, values in enumerate(pending["archive"], 1)),
+                            )
+            except BaseException as exc:  # re-raised in the calling thread
+                failure.append(exc)
+                while batches.get() is not None:
+                    pass
+            finally:
+                conn.close()
+
+        writer = threading.Thread(target=write, name="history-import", daemon=True)
+        writer.start()
+        total = 0
+        try:
+            pending: Dict[str, List[tuple]] = {table: [] for table in EXPORT_TABLES}
+            for count, row in enumerate(rows, 1):
+                table = row.get("table", "conversation")
+                if table not in pending:
+                    raise ValueError(f"Unknown table {table!r} in row {count}")
+                pending[table].append((str(row["user_id"]), row["role"], row["content"], row.get("timestamp")))
+                total = count
+                if count % batch_size == 0:
+                    batches.put(pending)
+                    pending = {table: [] for table in EXPORT_TABLES}
+                    if failure:
+                        break
+            else:
+                batches.put(pending)
+        finally:
+            batches.put(None)
+            writer.join()
+        if failure:
+            raise failure[0]
+        logger.info("Imported %d rows into %s", total, self.db_path)
+        return total
+
+    @staticmethod
+    def _reserve_ids(conn: sqlite3.Connection, count: int) -> int:
+        """Reserve *count* ids for archive rows and return the id before them.
+
+        Pruning copies messages into the archive under their conversation id,
+        so imported archive rows take ids from the conversation sequence too;
+        otherwise a later message could collide with them and be lost.
+        """
+
+        (base,) = conn.execute(
+            """
+            SELECT MAX(
+                COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'conversation'), 0),
+                COALESCE((SELECT MAX(id) FROM conversation), 0),
+                COALESCE((SELECT MAX(id) FROM conversation_archive), 0)
+            )
+            """
+        ).fetchone()
+        if not conn.execute(
+            "UPDATE sqlite_sequence SET seq = ? WHERE name = 'conversation'", (base + count,)
+        ).rowcount:
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('conversation', ?)", (base + count,))
+        return base
+
     def clear(self) -> None:
         with self._connect() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM conversation")
+            cursor.execute("DELETE FROM conversation_archive")
             conn.commit()
         logger.info("Cleared all conversation history from %s", self.db_path)
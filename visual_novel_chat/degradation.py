@@ -0,0 +1,144 @@
+"""Load-adaptive quality tiers for rendering and emotion classification."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import get_setting
+
+logger = logging.getLogger(__name__)
+
+FULL = 0
+REUSE_MOOD = 1
+REDUCED_FRAME = 2
+TEXT_ONLY = 3
+TIER_NAMES = ("full", "reuse_mood", "reduced_frame", "text_only")
+
+
+def _thresholds(value: Any, scale: float = 1.0) -> Tuple[Optional[float], ...]:
+    """Parse ``"4,8,16"`` into one threshold per degraded tier; ``0`` disables a tier."""
+
+    parts = [part.strip() for part in str(value).split(",")] if value not in (None, "") else []
+    parts += ["0"] * (len(TIER_NAMES) - 1 - len(parts))
+    return tuple(float(part) * scale if float(part) > 0 else None for part in parts[: len(TIER_NAMES) - 1])
+
+
+@dataclass
+class DegradationMetrics:
+    """Requests served per tier and how often the tier changed."""
+
+    served: List[int] = field(default_factory=lambda: [0] * len(TIER_NAMES))
+    transitions: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        metrics = {f"degrade_{name}": count for name, count in zip(TIER_NAMES, self.served)}
+        metrics["degrade_transitions"] = self.transitions
+        return metrics
+
+
+@dataclass
+class DegradationController:
+    """Pick a quality tier from scheduler queue depth and event-loop lag.
+
+    Tier ``n`` (1-3) is entered as soon as the queued request count reaches
+    ``queue_thresholds[n - 1]`` or the loop lag reaches
+    ``lag_thresholds[n - 1]`` seconds; ``None`` disables that trigger. Tiers
+    are cumulative: reusing the last mood, then a cheaper cached and
+    downscaled frame, then a text-only reply. The controller climbs
+    immediately but only steps down one tier after load has stayed below the
+    current tier for *cooldown* seconds, so it does not flap at a boundary.
+
+    Loop lag is measured by :meth:`monitor`, which oversleeps when handlers
+    block the loop; it decays by *lag_decay* per sample so one spike does not
+    keep the bot degraded.
+    """
+
+    queue_thresholds: Tuple[Optional[float], ...] = (4, 8, 16)
+    lag_thresholds: Tuple[Optional[float], ...] = (0.1, 0.25, 0.5)
+    cooldown: float = 10.0
+    lag_decay: float = 0.8
+    clock: Callable[[], float] = time.monotonic
+    tier: int = FULL
+    loop_lag: float = 0.0
+    metrics: DegradationMetrics = field(default_factory=DegradationMetrics)
+    _last_pressure: float = field(default=0.0, init=False, repr=False)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "DegradationController":
+        """Build a controller from the ``DEGRADE-*`` settings."""
+
+        return cls(
+            queue_thresholds=_thresholds(get_setting(config, "DEGRADE-QUEUE-DEPTHS", "4,8,16")),
+            lag_thresholds=_thresholds(get_setting(config, "DEGRADE-LOOP-LAG-MS", "100,250,500"), scale=0.001),
+            cooldown=float(get_setting(config, "DEGRADE-COOLDOWN", 10)),
+        )
+
+    def pressure(self, queue_depth: int) -> int:
+        """Return the tier the current load calls for, ignoring hysteresis."""
+
+        target = FULL
+        for tier, (depth, lag) in enumerate(zip(self.queue_thresholds, self.lag_thresholds), start=1):
+            if (depth is not None and queue_depth >= depth) or (lag is not None and self.loop_lag >= lag):
+                target = tier
+        return target
+
+    def update(self, queue_depth: int) -> int:
+        """Re-evaluate the tier for a request arriving with *queue_depth* queued."""
+
+        now = self.clock()
+        target = self.pressure(queue_depth)
+        if target >= self.tier:
+            self._last_pressure = now
+            new_tier = target
+        elif now - self._last_pressure >= self.cooldown:
+            self._last_pressure = now
+            new_tier = self.tier - 1
+        else:
+            new_tier = self.tier
+        if new_tier != self.tier:
+            log = logger.warning if new_tier > self.tier else logger.info
+            log(
+                "Quality tier %s -> %s (queue depth %d, loop lag %.0f ms)",
+                TIER_NAMES[self.tier],
+                TIER_NAMES[new_tier],
+                queue_depth,
+                self.loop_lag * 1000,
+            )
+            self.tier = new_tier
+            self.metrics.transitions += 1
+        self.metrics.served[self.tier] += 1
+        return self.tier
+
+    def observe_lag(self, lag: float) -> None:
+        self.loop_lag = max(lag, self.loop_lag * self.lag_decay)
+
+    async def monitor(self, interval: float = 0.1) -> None:
+        """Sample event-loop lag forever; run it as a background task."""
+
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            self.observe_lag(max(loop.time() - started - interval, 0.0))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "degrade_tier": TIER_NAMES[self.tier],
+            "loop_lag_ms": round(self.loop_lag * 1000, 1),
+            **self.metrics.as_dict(),
+        }
+
+
+__all__ = [
+    "DegradationController",
+    "DegradationMetrics",
+    "FULL",
+    "REDUCED_FRAME",
+    "REUSE_MOOD",
+    "TEXT_ONLY",
+    "TIER_NAMES",
+]
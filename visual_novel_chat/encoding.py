@@ -0,0 +1,218 @@
+"""Size-budgeted image encoding for rendered visual novel frames."""
+
+from __future__ import annotations
+
+import io
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image, features
+
+from .config import get_setting
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp", "PNG": ".png"}
+
+
+@dataclass(frozen=True)
+class EncodingProfile:
+    """Formats to try, in order of preference, and the lossy quality range."""
+
+    formats: Tuple[str, ...]
+    min_quality: int = 40
+    max_quality: int = 90
+
+
+# Every screen is dominated by the painted backgrounds and sprites, where WebP
+# is roughly 35% smaller than JPEG at the same quality and palette PNGs are
+# two to three times larger (see benchmarks/bench_encoding.py). The map
+# overlay hides most of the scene, so it tolerates a lower quality.
+DEFAULT_PROFILES: Dict[str, EncodingProfile] = {
+    "chat": EncodingProfile(("WEBP", "JPEG"), min_quality=50, max_quality=80),
+    "menu": EncodingProfile(("WEBP", "JPEG"), min_quality=50, max_quality=80),
+    "about": EncodingProfile(("WEBP", "JPEG"), min_quality=45, max_quality=75),
+    "map": EncodingProfile(("WEBP", "JPEG"), min_quality=40, max_quality=70),
+}
+FALLBACK_PROFILE = EncodingProfile(("JPEG",), min_quality=50, max_quality=80)
+
+
+@dataclass
+class EncodedFrame:
+    """Result of encoding a single frame."""
+
+    path: Path
+    format: str
+    quality: Optional[int]
+    size: int
+    seconds: float
+    within_budget: bool
+    data: bytes = field(default=b"", repr=False)
+
+
+@dataclass
+class ScreenEncodingStats:
+    """Aggregated encoding cost for one screen type."""
+
+    frames: int = 0
+    total_bytes: int = 0
+    total_seconds: float = 0.0
+    over_budget: int = 0
+
+    def record(self, frame: EncodedFrame) -> None:
+        self.frames += 1
+        self.total_bytes += frame.size
+        self.total_seconds += frame.seconds
+        self.over_budget += 0 if frame.within_budget else 1
+
+
+@dataclass
+class FrameEncoder:
+    """Pick a format and quality per screen type that fits *byte_budget*.
+
+    The quality found for each screen and format is remembered, so in steady
+    state a frame costs a single encode; a binary search only runs when the
+    remembered quality no longer fits. Frames that come in well under budget
+    raise the remembered quality by *quality_step* so it recovers over time.
+    """
+
+    byte_budget: int = 64_000
+    profiles: Dict[str, EncodingProfile] = field(default_factory=lambda: dict(DEFAULT_PROFILES))
+    optimize: bool = True
+    progressive: bool = False
+    webp_method: int = 2
+    quality_step: int = 5
+    headroom: float = 0.8
+    stats: Dict[str, ScreenEncodingStats] = field(default_factory=dict)
+    _qualities: Dict[Tuple[str, str], int] = field(default_factory=dict, init=False, repr=False)
+    _webp: bool = field(default_factory=lambda: bool(features.check("webp")), init=False, repr=False)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "FrameEncoder":
+        """Build an encoder from the ``IMAGE-*`` settings."""
+
+        def flag(key: str, default: str) -> bool:
+            return str(get_setting(config, key, default)).lower() not in {"0", "false", "no"}
+
+        return cls(
+            byte_budget=int(get_setting(config, "IMAGE-BYTE-BUDGET", 64_000)),
+            optimize=flag("IMAGE-OPTIMIZE", "1"),
+            progressive=flag("IMAGE-PROGRESSIVE", "0"),
+            webp_method=int(get_setting(config, "IMAGE-WEBP-METHOD", 2)),
+        )
+
+    def encode(self, image: Image.Image, screen: str, output_stem: Path) -> EncodedFrame:
+        """Encode *image* for *screen* and write it next to *output_stem*.
+
+        A variant such as ``chat:reduced`` uses its base screen's profile but
+        remembers its own quality and stats.
+        """
+
+        started = time.perf_counter()
+        rgb = image.convert("RGB")
+        profile = self.profiles.get(screen.partition(":")[0], FALLBACK_PROFILE)
+        smallest: Optional[Tuple[bytes, str, Optional[int]]] = None
+        for image_format in profile.formats:
+            if image_format == "WEBP" and not self._webp:
+                continue
+            data, quality = self._encode_format(rgb, image_format, screen, profile)
+            if smallest is None or len(data) < len(smallest[0]):
+                smallest = (data, image_format, quality)
+            if len(data) <= self.byte_budget:
+                break
+        if smallest is None:
+            raise ValueError(f"No available image format for screen {screen!r}")
+        data, image_format, quality = smallest
+
+        path = Path(output_stem).with_suffix(EXTENSIONS[image_format])
+        path.write_bytes(data)
+        frame = EncodedFrame(
+            path=path,
+            format=image_format,
+            quality=quality,
+            size=len(data),
+            seconds=time.perf_counter() - started,
+            within_budget=len(data) <= self.byte_budget,
+            data=data,
+        )
+        self.stats.setdefault(screen, ScreenEncodingStats()).record(frame)
+        logger.debug(
+            "Encoded %s frame as %s q=%s: %d bytes in %.1f ms",
+            screen,
+            image_format,
+            quality,
+            frame.size,
+            frame.seconds * 1000,
+        )
+        return frame
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Return aggregated encoding stats per screen type."""
+
+        return {screen: asdict(stats) for screen, stats in self.stats.items()}
+
+    # -- Encoders ------------------------------------------------------------
+
+    def _save(self, image: Image.Image, image_format: str, quality: Optional[int]) -> bytes:
+        buffer = io.BytesIO()
+        if image_format == "PNG":
+            palette = image.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+            palette.save(buffer, "PNG", optimize=self.optimize)
+        elif image_format == "WEBP":
+            image.save(buffer, "WEBP", quality=quality, method=self.webp_method)
+        else:
+            image.save(
+                buffer,
+                "JPEG",
+                quality=quality,
+                optimize=self.optimize,
+                progressive=self.progressive,
+            )
+        return buffer.getvalue()
+
+    def _encode_format(
+        self,
+        image: Image.Image,
+        image_format: str,
+        screen: str,
+        profile: EncodingProfile,
+    ) -> Tuple[bytes, Optional[int]]:
+        if image_format == "PNG":
+            return self._save(image, "PNG", None), None
+
+        key = (screen, image_format)
+        quality = self._qualities.get(key, profile.max_quality)
+        data = self._save(image, image_format, quality)
+        if len(data) <= self.byte_budget:
+            if len(data) < self.byte_budget * self.headroom:
+                self._qualities[key] = min(quality + self.quality_step, profile.max_quality)
+            return data, quality
+
+        low, high = profile.min_quality, quality - 1
+        best: Optional[Tuple[bytes, int]] = None
+        while low <= high:
+            middle = (low + high) // 2
+            candidate = self._save(image, image_format, middle)
+            if len(candidate) <= self.byte_budget:
+                best = (candidate, middle)
+                low = middle + 1
+            else:
+                data, quality = candidate, middle
+                high = middle - 1
+        if best is not None:
+            self._qualities[key] = best[1]
+            return best
+        self._qualities[key] = profile.min_quality
+        return data, quality
+
+
+__all__ = [
+    "DEFAULT_PROFILES",
+    "EncodedFrame",
+    "EncodingProfile",
+    "FrameEncoder",
+    "ScreenEncodingStats",
+]
@@ -0,0 +1,291 @@
+"""Keyword lexicon for cheap emotion detection in front of the transformer."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .config import get_setting
+from .text_utils import STOPWORDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEXICON_PATH = Path(__file__).with_name("emotion_lexicon.tsv")
+
+# Hand-picked cues for the six labels the emotion model predicts (which are
+# also the sprite moods). WordNet synonyms of these are added when the
+# lexicon is built.
+EMOTION_SEEDS: Dict[str, Tuple[str, ...]] = {
+    "joy": (
+        "happy", "glad", "delighted", "cheerful", "joyful", "excited", "yay", "hooray", "fun",
+        "wonderful", "great", "awesome", "fantastic", "laugh", "haha", "hehe", "smile", "enjoy",
+        "celebrate", "thrilled", "pleased", "proud", "grateful", "thankful", "relieved", "amazing",
+    ),
+    "love": (
+        "love", "adore", "darling", "sweetheart", "beloved", "cherish", "affection", "hug", "kiss",
+        "cuddle", "romantic", "crush", "heart", "tender", "caring", "sweetie", "honey", "fond",
+        "devoted", "dear", "blush",
+    ),
+    "sadness": (
+        "sad", "unhappy", "sorrow", "cry", "crying", "tears", "lonely", "alone", "miss", "depressed",
+        "miserable", "heartbroken", "grief", "gloomy", "disappointed", "hurt", "regret", "sigh",
+        "melancholy", "upset", "sorry", "lost", "tired",
+    ),
+    "anger": (
+        "angry", "mad", "furious", "annoyed", "irritated", "hate", "rage", "outraged", "livid",
+        "frustrated", "resent", "hmph", "stupid", "idiot", "jerk", "unfair", "grr", "infuriating",
+        "offended", "bitter",
+    ),
+    "fear": (
+        "afraid", "scared", "frightened", "terrified", "fear", "nervous", "anxious", "worried",
+        "panic", "dread", "creepy", "spooky", "horror", "shaking", "tremble", "uneasy", "danger",
+        "eek", "nightmare",
+    ),
+    "surprise": (
+        "surprised", "surprise", "wow", "whoa", "astonished", "amazed", "shocked", "unexpected",
+        "suddenly", "unbelievable", "stunned", "speechless", "startled", "omg", "huh",
+    ),
+}
+
+NEGATIONS = frozenset(
+    "not no never nor cannot without hardly don't doesn't didn't isn't aren't wasn't weren't "
+    "can't couldn't won't wouldn't shouldn't dont doesnt didnt isnt cant wont".split()
+)
+NEGATION_WINDOW = 3
+_SUFFIXES = ("s", "es", "ed", "d", "ing", "ly")
+_TOKEN_PATTERN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+
+def build_lexicon(
+    seeds: Optional[Dict[str, Sequence[str]]] = None,
+    wordnet: Any = None,
+    senses: int = 2,
+) -> Dict[str, str]:
+    """Return a ``word -> label`` table grown from *seeds*.
+
+    With the NLTK *wordnet* corpus reader, each seed also contributes the
+    single-word lemmas of its first *senses* synsets (and of their similar
+    adjectives). Words that end up under more than one label are dropped,
+    since they cannot decide between them.
+    """
+
+    seeds = seeds or EMOTION_SEEDS
+    candidates: Dict[str, set] = {}
+    for label, words in seeds.items():
+        for word in words:
+            expanded = {word}
+            if wordnet is not None:
+                for synset in wordnet.synsets(word)[:senses]:
+                    for related in [synset, *synset.similar_tos()]:
+                        expanded.update(lemma.lower() for lemma in related.lemma_names())
+            for term in expanded:
+                if term.isalpha() and len(term) >= 3 and term not in STOPWORDS and term not in NEGATIONS:
+                    candidates.setdefault(term, set()).add(label)
+    return {word: labels.pop() for word, labels in sorted(candidates.items()) if len(labels) == 1}
+
+
+def save_lexicon(lexicon: Dict[str, str], path: Path) -> None:
+    """Write *lexicon* as one ``label<TAB>word word ...`` line per label."""
+
+    by_label: Dict[str, List[str]] = {}
+    for word, label in lexicon.items():
+        by_label.setdefault(label, []).append(word)
+    lines = [f"{label}\t{' '.join(sorted(words))}\n" for label, words in sorted(by_label.items())]
+    Path(path).write_text("".join(lines), encoding="utf-8")
+
+
+def load_lexicon(path: Path = DEFAULT_LEXICON_PATH) -> Dict[str, str]:
+    """Read a table written by :func:`save_lexicon`.
+
+    Falls back to the seed words alone when *path* does not exist, e.g. in a
+    checkout where ``python -m visual_novel_chat.lexicon`` has not been run.
+    """
+
+    try:
+        text = Path(path).read_text(encoding="utf-8")
+    except FileNotFoundError:
+        logger.info("No emotion lexicon at %s; using the built-in seed words", path)
+        return build_lexicon()
+    lexicon: Dict[str, str] = {}
+    for line in text.splitlines():
+        label, _, words = line.partition("\t")
+        lexicon.update(dict.fromkeys(words.split(), label))
+    return lexicon
+
+
+@dataclass
+class LexiconScorer:
+    """Count lexicon hits per label and decide when the count is conclusive.
+
+    A text is answered only when at least *min_hits* cue words were found, the
+    leading label holds at least *min_share* of them and no cue is negated
+    ("not happy"); everything else is left to the transformer.
+    """
+
+    lexicon: Dict[str, str]
+    min_hits: int = 2
+    min_share: float = 0.75
+
+    def lookup(self, token: str) -> Optional[str]:
+        label = self.lexicon.get(token)
+        if label is None:
+            for suffix in _SUFFIXES:
+                if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+                    label = self.lexicon.get(token[: -len(suffix)])
+                    if label is not None:
+                        break
+        return label
+
+    def score(self, text: str) -> Optional[Dict[str, float | str]]:
+        """Return ``{"label", "score"}`` when confident, otherwise ``None``."""
+
+        counts: Dict[str, int] = {}
+        last_negation = -NEGATION_WINDOW - 1
+        for index, token in enumerate(_TOKEN_PATTERN.findall(text.lower())):
+            if token in NEGATIONS:
+                last_negation = index
+                continue
+            label = self.lookup(token)
+            if label is None:
+                continue
+            if index - last_negation <= NEGATION_WINDOW:
+                return None
+            counts[label] = counts.get(label, 0) + 1
+        total = sum(counts.values())
+        if not total or total < self.min_hits:
+            return None
+        label, hits = max(counts.items(), key=lambda item: item[1])
+        share = hits / total
+        if share < self.min_share:
+            return None
+        return {"label": label, "score": share}
+
+
+@dataclass
+class CascadeMetrics:
+    fast_path: int = 0
+    fallback: int = 0
+
+    @property
+    def fast_path_ratio(self) -> float:
+        total = self.fast_path + self.fallback
+        return self.fast_path / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "emotion_fast_path": self.fast_path,
+            "emotion_fallback": self.fallback,
+            "emotion_fast_path_ratio": round(self.fast_path_ratio, 3),
+        }
+
+
+class CascadeClassifier:
+    """Answer from the lexicon when it is confident, otherwise ask *model*.
+
+    *model* is anything with ``predict(text)`` returning ``{"label", "score"}``,
+    normally :class:`~visual_novel_chat.ai.EmotionClassifier`, which is only
+    loaded once a text actually needs it.
+    """
+
+    def __init__(self, model: Any, scorer: Optional[LexiconScorer] = None) -> None:
+        self.model = model
+        self.scorer = scorer or LexiconScorer(load_lexicon())
+        self.metrics = CascadeMetrics()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], model: Any) -> "CascadeClassifier":
+        """Build a cascade from the ``EMOTION-*`` settings."""
+
+        path = Path(get_setting(config, "EMOTION-LEXICON", DEFAULT_LEXICON_PATH))
+        scorer = LexiconScorer(
+            load_lexicon(path),
+            min_hits=int(get_setting(config, "EMOTION-MIN-HITS", 2)),
+            min_share=float(get_setting(config, "EMOTION-MIN-SHARE", 0.75)),
+        )
+        return cls(model, scorer)
+
+    def predict(self, text: str) -> Dict[str, float | str]:
+        """Return the most likely emotion for *text*."""
+
+        prediction = self.scorer.score(text)
+        with self._lock:
+            if prediction is None:
+                self.metrics.fallback += 1
+            else:
+                self.metrics.fast_path += 1
+        if prediction is None:
+            return self.model.predict(text)
+        logger.debug("Lexicon fast path chose %s (%.2f)", prediction["label"], prediction["score"])
+        return prediction
+
+
+def evaluate(cascade: CascadeClassifier, samples: Iterable[Tuple[str, str]]) -> Dict[str, float]:
+    """Compare the lexicon fast path with the full model on labelled *samples*.
+
+    Returns the share of samples the fast path answered, how often its answer
+    matched the full model's, and the accuracy of the cascade and of the full
+    model against the labels.
+    """
+
+    answered = agreed = cascade_correct = model_correct = total = 0
+    for text, label in samples:
+        total += 1
+        model_label = cascade.model.predict(text)["label"]
+        fast = cascade.scorer.score(text)
+        cascade_label = fast["label"] if fast is not None else model_label
+        if fast is not None:
+            answered += 1
+            agreed += fast["label"] == model_label
+        cascade_correct += cascade_label == label
+        model_correct += model_label == label
+    return {
+        "samples": total,
+        "fast_path_ratio": answered / total if total else 0.0,
+        "agreement": agreed / answered if answered else 0.0,
+        "cascade_accuracy": cascade_correct / total if total else 0.0,
+        "model_accuracy": model_correct / total if total else 0.0,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Build the lexicon table, expanding the seeds with WordNet when installed."""
+
+    parser = argparse.ArgumentParser(prog="python -m visual_novel_chat.lexicon", description=main.__doc__)
+    parser.add_argument("--output", type=Path, default=DEFAULT_LEXICON_PATH)
+    parser.add_argument("--senses", type=int, default=2, help="WordNet senses to expand per seed word")
+    args = parser.parse_args(argv)
+
+    try:
+        from nltk.corpus import wordnet
+
+        wordnet.ensure_loaded()
+    except (ImportError, LookupError):
+        logger.warning("WordNet is not available; writing the seed words only")
+        wordnet = None
+    lexicon = build_lexicon(wordnet=wordnet, senses=args.senses)
+    save_lexicon(lexicon, args.output)
+    logger.info("Wrote %d lexicon entries to %s", len(lexicon), args.output)
+
+
+__all__ = [
+    "CascadeClassifier",
+    "CascadeMetrics",
+    "DEFAULT_LEXICON_PATH",
+    "EMOTION_SEEDS",
+    "LexiconScorer",
+    "build_lexicon",
+    "evaluate",
+    "load_lexicon",
+    "save_lexicon",
+]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
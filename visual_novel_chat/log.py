@@ -0,0 +1,159 @@
+"""Logging configuration with request correlation IDs and sampled debug output."""
+
+from __future__ import annotations
+
+import atexit
+import contextvars
+import functools
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import uuid
+import zlib
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator, Optional, TypeVar
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+NO_REQUEST = "-"
+
+T = TypeVar("T")
+
+_request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default=NO_REQUEST)
+
+logger = logging.getLogger(__name__)
+
+
+def current_request_id() -> str:
+    """Return the correlation ID of the request being handled, or ``"-"``."""
+
+    return _request_id.get()
+
+
+@contextmanager
+def request_context(prefix: str = "req") -> Iterator[str]:
+    """Tag every log record emitted inside the block with a fresh request ID."""
+
+    token = _request_id.set(f"{prefix}-{uuid.uuid4().hex[:8]}")
+    try:
+        yield _request_id.get()
+    finally:
+        _request_id.reset(token)
+
+
+def with_request_context(func: Callable[..., Awaitable[T]], prefix: Optional[str] = None) -> Callable[..., Awaitable[T]]:
+    """Return an async wrapper running *func* inside :func:`request_context`."""
+
+    label = prefix or getattr(func, "__name__", "req")
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        with request_context(label):
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request ID to each record as ``request_id``."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records at or below *max_level*.
+
+    Records belonging to a request are sampled per request rather than per
+    record, so a sampled request keeps its complete debug trail. Records
+    emitted outside any request are sampled independently.
+    """
+
+    def __init__(self, rate: float, max_level: int = logging.DEBUG) -> None:
+        super().__init__()
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError("sample rate must be between 0 and 1")
+        self.rate = rate
+        self.max_level = max_level
+        self._threshold = int(rate * 0xFFFFFFFF)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level or self.rate >= 1.0:
+            return True
+        request_id = _request_id.get()
+        if request_id == NO_REQUEST:
+            return random.random() < self.rate
+        return zlib.crc32(request_id.encode()) <= self._threshold
+
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue records untouched for a listener in the same process.
+
+    The stock :meth:`~logging.handlers.QueueHandler.prepare` formats the
+    message and copies the record on the calling thread so it can be pickled;
+    an in-process queue needs neither, so all formatting is left to the
+    listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _stop_listener(listener: logging.handlers.QueueListener) -> None:
+    if getattr(listener, "_thread", None) is not None:
+        listener.stop()
+
+
+def configure_logging(
+    level: int | str | None = None,
+    sample_rate: float | None = None,
+    stream: Any = None,
+) -> logging.handlers.QueueListener:
+    """Route root logging through a queue so formatting and I/O happen off-loop.
+
+    *level* and *sample_rate* default to the ``LOG_LEVEL`` and
+    ``LOG_SAMPLE_RATE`` environment variables (``INFO`` and ``1.0``). Returns
+    the started :class:`~logging.handlers.QueueListener`; it is stopped
+    automatically at interpreter exit.
+    """
+
+    if level is None:
+        level = os.getenv("LOG_LEVEL", "INFO")
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    if sample_rate is None:
+        sample_rate = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+
+    output = logging.StreamHandler(stream)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = LocalQueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    if sample_rate < 1.0:
+        queue_handler.addFilter(SamplingFilter(sample_rate))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, output)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    logger.debug("Logging configured at level %s with sample rate %.3f", level, sample_rate)
+    return listener
+
+
+__all__ = [
+    "LocalQueueHandler",
+    "RequestIdFilter",
+    "SamplingFilter",
+    "configure_logging",
+    "current_request_id",
+    "request_context",
+    "with_request_context",
+]
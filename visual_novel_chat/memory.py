@@ -0,0 +1,218 @@
+"""Process-wide memory accounting with a budget enforced by cache eviction."""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .assets import memory_usage
+from .config import get_setting
+
+logger = logging.getLogger(__name__)
+
+_PACKAGE_ROOT = str(Path(__file__).resolve().parent)
+
+
+def image_bytes(images: Iterable[Any]) -> int:
+    """Estimate the decoded size of PIL *images* (width × height × bands)."""
+
+    return sum(image.width * image.height * len(image.getbands()) for image in images)
+
+
+@dataclass
+class MemoryCategory:
+    """A named consumer of memory.
+
+    *size* returns the bytes currently held. Categories with an *evict*
+    callable can give memory back: it is asked to free at least the given
+    number of bytes and returns how many it freed. Lower *priority* values are
+    evicted first.
+    """
+
+    name: str
+    size: Callable[[], int]
+    evict: Optional[Callable[[int], int]] = None
+    priority: int = 0
+
+
+@dataclass
+class MemoryMetrics:
+    enforcements: int = 0
+    evictions: int = 0
+    evicted_bytes: int = 0
+    over_budget: int = 0
+
+
+@dataclass
+class MemoryAccountant:
+    """Track bytes held per category and keep their total under *budget*.
+
+    The budget applies to the accounted total, not to the process RSS: Python
+    rarely returns freed memory to the OS, so evicting until RSS drops would
+    empty every cache without effect. RSS and PSS are reported alongside, and
+    with *trace_frames* set, :mod:`tracemalloc` attributes live allocations to
+    the package's modules to show what the estimates miss.
+    """
+
+    budget: Optional[int] = None
+    trace_frames: int = 0
+    categories: Dict[str, MemoryCategory] = field(default_factory=dict)
+    metrics: MemoryMetrics = field(default_factory=MemoryMetrics)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _unreachable: bool = field(default=False, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.trace_frames > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+            logger.info("tracemalloc started with %d frame(s)", self.trace_frames)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "MemoryAccountant":
+        """Build an accountant from the ``MEMORY-*`` settings."""
+
+        budget_mb = float(get_setting(config, "MEMORY-BUDGET-MB", 0))
+        return cls(
+            budget=int(budget_mb * 2**20) if budget_mb > 0 else None,
+            trace_frames=int(get_setting(config, "MEMORY-TRACE-FRAMES", 0)),
+        )
+
+    def register(
+        self,
+        name: str,
+        size: Callable[[], int],
+        evict: Optional[Callable[[int], int]] = None,
+        priority: int = 0,
+    ) -> None:
+        self.categories[name] = MemoryCategory(name, size, evict, priority)
+
+    def usage(self) -> Dict[str, int]:
+        """Return the bytes held by each category."""
+
+        usage = {}
+        for name, category in self.categories.items():
+            try:
+                usage[name] = int(category.size())
+            except Exception:  # a broken estimate must not take the bot down
+                logger.exception("Could not measure memory category %s", name)
+                usage[name] = 0
+        return usage
+
+    def enforce(self) -> int:
+        """Evict from the lowest-priority categories until within budget.
+
+        Nothing is evicted when the evictable categories together hold less
+        than the excess: emptying them could not reach the budget, and an
+        unloaded model would only be loaded again by the next request.
+        Returns the number of bytes freed.
+        """
+
+        if self.budget is None:
+            return 0
+        with self._lock:
+            self.metrics.enforcements += 1
+            usage = self.usage()
+            excess = sum(usage.values()) - self.budget
+            if excess <= 0:
+                self._unreachable = False
+                return 0
+            self.metrics.over_budget += 1
+            evictable = sorted(
+                (category for category in self.categories.values() if category.evict is not None),
+                key=lambda category: category.priority,
+            )
+            if sum(usage[category.name] for category in evictable) < excess:
+                if not self._unreachable:
+                    logger.warning(
+                        "Memory is %d bytes over budget, more than eviction can free; "
+                        "raise MEMORY-BUDGET-MB to cover the non-evictable categories",
+                        excess,
+                    )
+                self._unreachable = True
+                return 0
+            self._unreachable = False
+            freed = 0
+            for category in evictable:
+                if freed >= excess:
+                    break
+                released = category.evict(excess - freed)
+                if released:
+                    freed += released
+                    self.metrics.evictions += 1
+                    logger.info("Evicted %d bytes from %s to stay within the memory budget", released, category.name)
+            self.metrics.evicted_bytes += freed
+            if freed < excess:
+                logger.warning("Memory still %d bytes over budget after eviction", excess - freed)
+            return freed
+
+    def traced(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """Return the package modules holding the most traced memory."""
+
+        if not tracemalloc.is_tracing():
+            return []
+        statistics = tracemalloc.take_snapshot().statistics("filename")
+        modules = [
+            (Path(stat.traceback[0].filename).name, stat.size)
+            for stat in statistics
+            if stat.traceback[0].filename.startswith(_PACKAGE_ROOT)
+        ]
+        return modules[:limit]
+
+    def report(self) -> Dict[str, Any]:
+        """Return usage, budget, process memory and traced allocations."""
+
+        usage = self.usage()
+        report: Dict[str, Any] = {
+            "budget": self.budget,
+            "accounted": sum(usage.values()),
+            "categories": usage,
+            "process": memory_usage(),
+            **asdict(self.metrics),
+        }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            report["traced"] = {"current": current, "peak": peak, "modules": dict(self.traced())}
+        return report
+
+
+def serve_memory_endpoint(accountant: MemoryAccountant, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve ``GET /memory`` as JSON from a daemon thread and return the server.
+
+    The endpoint binds to localhost by default; it is meant for sidecars and
+    operators on the same host, not for the public internet.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") != "/memory":
+                self.send_error(404)
+                return
+            body = json.dumps(accountant.report()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            logger.debug("Memory endpoint: " + format, *args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    thread = threading.Thread(target=server.serve_forever, name="memory-endpoint", daemon=True)
+    thread.start()
+    logger.info("Memory endpoint listening on http://%s:%d/memory", host, server.server_address[1])
+    return server
+
+
+__all__ = [
+    "MemoryAccountant",
+    "MemoryCategory",
+    "MemoryMetrics",
+    "image_bytes",
+    "serve_memory_endpoint",
+]
@@ -16,7 +16,6 @@ def _get_client() -> Any:
     except ModuleNotFoundError as exc:  # pragma: no cover - optional dependency
         logger.error("The 'ollama' package is not installed", exc_info=exc)
         raise
-    logger.debug("Ollama client module imported successfully")
     return ollama
 
 
@@ -0,0 +1,282 @@
+"""Opt-in profiling hooks for command handlers and button callbacks."""
+
+from __future__ import annotations
+
+import cProfile
+import contextvars
+import functools
+import logging
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Set, TypeVar
+
+from .config import get_setting
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_DIR = Path("profiles")
+PROFILE_MODES = ("cprofile", "stacks")
+STACKS_FILENAME = "stacks.folded"
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Capture:
+    """Worker-thread work belonging to the invocation being profiled."""
+
+    mode: str
+    profiles: List[cProfile.Profile] = field(default_factory=list)
+    threads: Set[int] = field(default_factory=set)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @contextmanager
+    def thread(self) -> Iterator[None]:
+        if self.mode == "cprofile":
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:  # Python 3.12+ allows one active cProfile per process
+                logger.debug("Worker thread not profiled: another profiler is active")
+                yield
+                return
+            try:
+                yield
+            finally:
+                profile.disable()
+                with self.lock:
+                    self.profiles.append(profile)
+        else:
+            ident = threading.get_ident()
+            with self.lock:
+                self.threads.add(ident)
+            try:
+                yield
+            finally:
+                with self.lock:
+                    self.threads.discard(ident)
+
+
+_capture: contextvars.ContextVar[Optional[_Capture]] = contextvars.ContextVar("profile_capture", default=None)
+
+
+@dataclass
+class Profiler:
+    """Profile a configurable fraction of handler invocations.
+
+    In ``cprofile`` mode every sampled invocation is written to its own
+    ``.prof`` file (readable with :mod:`pstats`, snakeviz or flameprof) and only
+    the newest *max_profiles* files are retained. In ``stacks`` mode a
+    background thread samples the handler's thread every *stack_interval*
+    seconds and aggregates collapsed stacks into ``stacks.folded``, which can be
+    fed directly to ``flamegraph.pl`` or speedscope. At most *max_stacks*
+    distinct stacks are kept.
+
+    Work a sampled invocation hands to worker threads is only visible when
+    the callable is wrapped with :meth:`bind`; it is then profiled in its
+    thread and merged into the invocation's output.
+
+    Only one invocation is profiled at a time; overlapping invocations are
+    skipped rather than queued so the overhead stays bounded. The event-loop
+    thread is profiled as a whole, so other handlers that run while the
+    sampled one awaits appear in its profile and run under the profiler.
+    """
+
+    sample_rate: float = 0.0
+    output_dir: Path = DEFAULT_PROFILE_DIR
+    mode: str = "cprofile"
+    max_profiles: int = 50
+    max_stacks: int = 10_000
+    stack_interval: float = 0.005
+    random_source: Callable[[], float] = random.random
+    _active: bool = field(default=False, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _stacks: Counter = field(default_factory=Counter, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.output_dir = Path(self.output_dir)
+        self.set_sample_rate(self.sample_rate)
+        if self.mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {self.mode!r}; expected one of {PROFILE_MODES}")
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "Profiler":
+        """Build a profiler from *config*, letting ``PROFILE_*`` env vars win."""
+
+        profiler = cls(
+            sample_rate=float(get_setting(config, "PROFILE-RATE", 0.0)),
+            output_dir=Path(get_setting(config, "PROFILE-DIR", DEFAULT_PROFILE_DIR)),
+            mode=str(get_setting(config, "PROFILE-MODE", "cprofile")),
+            max_profiles=int(get_setting(config, "PROFILE-MAX-FILES", 50)),
+        )
+        if profiler.enabled:
+            logger.info(
+                "Profiling %.1f%% of handlers in %s mode to %s",
+                profiler.sample_rate * 100,
+                profiler.mode,
+                profiler.output_dir,
+            )
+        return profiler
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def set_sample_rate(self, rate: float) -> None:
+        """Change the fraction of invocations that are profiled at runtime."""
+
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError("sample rate must be between 0 and 1")
+        self.sample_rate = rate
+
+    def _acquire(self) -> bool:
+        if not self.enabled or self.random_source() >= self.sample_rate:
+            return False
+        with self._lock:
+            if self._active:
+                return False
+            self._active = True
+            return True
+
+    def _release(self) -> None:
+        with self._lock:
+            self._active = False
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        """Profile the enclosed block if this invocation is sampled."""
+
+        if not self._acquire():
+            yield
+            return
+        capture = _Capture(self.mode)
+        token = _capture.set(capture)
+        try:
+            if self.mode == "cprofile":
+                with self._profile_cprofile(name, capture):
+                    yield
+            else:
+                with self._profile_stacks(capture):
+                    yield
+        finally:
+            _capture.reset(token)
+            self._release()
+
+    def bind(self, func: Callable[..., T]) -> Callable[..., T]:
+        """Return *func*, profiled wherever it runs if this invocation is sampled.
+
+        Call it on the event loop inside :meth:`profile` and hand the result to
+        a worker thread, e.g. ``scheduler.submit(..., profiler.bind(query))``.
+        """
+
+        capture = _capture.get()
+        if capture is None:
+            return func
+
+        @functools.wraps(func)
+        def profiled(*args: Any, **kwargs: Any) -> T:
+            with capture.thread():
+                return func(*args, **kwargs)
+
+        return profiled
+
+    def wrap(self, func: Callable[..., Awaitable[T]], name: Optional[str] = None) -> Callable[..., Awaitable[T]]:
+        """Return an async wrapper that profiles calls to *func*."""
+
+        label = name or getattr(func, "__name__", "handler")
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            with self.profile(label):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    # -- cProfile mode -------------------------------------------------------
+
+    @contextmanager
+    def _profile_cprofile(self, name: str, capture: _Capture) -> Iterator[None]:
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - started
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            path = self.output_dir / f"{time.time_ns()}-{name}.prof"
+            stats = pstats.Stats(profiler)
+            with capture.lock:
+                for worker_profile in capture.profiles:
+                    stats.add(worker_profile)
+            stats.dump_stats(str(path))
+            logger.info(
+                "Wrote profile for %s (%.1f ms, %d worker call(s)) to %s",
+                name,
+                elapsed * 1000,
+                len(capture.profiles),
+                path,
+            )
+            self._enforce_retention()
+
+    def _enforce_retention(self) -> None:
+        profiles = sorted(self.output_dir.glob("*.prof"))
+        for stale in profiles[: max(len(profiles) - self.max_profiles, 0)]:
+            stale.unlink(missing_ok=True)
+
+    # -- Stack sampling mode -------------------------------------------------
+
+    @contextmanager
+    def _profile_stacks(self, capture: _Capture) -> Iterator[None]:
+        target = threading.get_ident()
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample_stacks,
+            args=(target, capture, stop),
+            name="vn-stack-sampler",
+            daemon=True,
+        )
+        sampler.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            sampler.join()
+            self._write_stacks()
+
+    def _sample_stacks(self, target: int, capture: _Capture, stop: threading.Event) -> None:
+        while not stop.wait(self.stack_interval):
+            with capture.lock:
+                threads = [target, *capture.threads]
+            frames = sys._current_frames()
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack = ";".join(reversed(names))
+                if stack in self._stacks or len(self._stacks) < self.max_stacks:
+                    self._stacks[stack] += 1
+
+    def _write_stacks(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / STACKS_FILENAME
+        with path.open("w", encoding="utf-8") as stacks_file:
+            for stack, count in self._stacks.items():
+                stacks_file.write(f"{stack} {count}\n")
+        logger.debug("Wrote %d aggregated stack(s) to %s", len(self._stacks), path)
+
+
+__all__ = ["Profiler"]
@@ -0,0 +1,325 @@
+"""Fair request scheduling with rate limits and backpressure."""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import heapq
+import itertools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
+
+from .config import get_setting
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+MAX_IDLE_BUCKETS = 10_000
+
+
+class SchedulerBusy(RuntimeError):
+    """Raised when a request is rejected instead of queued."""
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+@dataclass
+class TokenBucket:
+    """Classic token bucket refilled continuously at *rate* tokens per second."""
+
+    rate: float
+    capacity: float
+    clock: Callable[[], float] = time.monotonic
+    tokens: float = field(init=False)
+    updated: float = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.tokens = self.capacity
+        self.updated = self.clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def refund(self) -> None:
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+@dataclass
+class SchedulerMetrics:
+    """Counters describing scheduler throughput and queueing."""
+
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    rate_limited: int = 0
+    queue_full: int = 0
+    coalesced: int = 0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    total_wait: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class _Entry:
+    guild: str
+    user: str
+    func: Callable[..., Any]
+    args: Tuple[Any, ...]
+    kwargs: Dict[str, Any]
+    future: asyncio.Future
+    enqueued: float
+    context: contextvars.Context
+    key: Optional[Hashable] = None
+    followers: int = 0
+
+
+class FairScheduler:
+    """Run blocking calls in worker threads with weighted fair queueing.
+
+    Every request first has to take a token from its user's and its guild's
+    bucket; requests that cannot, or that would push the queue beyond
+    *max_queue* (or their guild beyond *max_queue_per_guild*), fail fast with
+    :class:`SchedulerBusy`. Admitted requests are
+    ordered by self-clocked weighted fair queueing over guilds, so a guild with
+    a deep backlog only gets its weighted share of the *workers* rather than
+    the whole model.
+
+    Each call runs in a copy of its submitter's :mod:`contextvars` context,
+    so request correlation IDs follow the work into the worker thread.
+
+    A request whose *coalesce_key* matches the queued or running entry its
+    user submitted last in the same guild is a duplicate: it takes no tokens
+    and no queue slot and gets that entry's result instead of running its
+    own call. The key must therefore identify everything the result depends
+    on besides the guild, the user and the user's earlier requests; any other
+    request from the user ends the match, since its call may change what the
+    next one would return.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        max_queue: int = 32,
+        max_queue_per_guild: int = 8,
+        user_rate: float = 0.1,
+        user_burst: float = 3,
+        guild_rate: float = 0.5,
+        guild_burst: float = 10,
+        guild_weights: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if workers <= 0:
+            raise ValueError("workers must be positive")
+        if max_queue <= 0:
+            raise ValueError("max_queue must be positive")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_queue_per_guild = max_queue_per_guild
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.guild_rate = guild_rate
+        self.guild_burst = guild_burst
+        self.guild_weights = dict(guild_weights or {})
+        self.metrics = SchedulerMetrics()
+        self._clock = clock
+        self._user_buckets: Dict[str, TokenBucket] = {}
+        self._guild_buckets: Dict[str, TokenBucket] = {}
+        self._queue: List[Tuple[float, int, _Entry]] = []
+        self._guild_depth: Dict[str, int] = {}
+        self._last_finish: Dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+        self._groups: Dict[Tuple[str, str], _Entry] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "FairScheduler":
+        """Build a scheduler from the ``SCHEDULER-*`` and rate limit settings."""
+
+        return cls(
+            workers=int(get_setting(config, "SCHEDULER-WORKERS", 1)),
+            max_queue=int(get_setting(config, "SCHEDULER-QUEUE-SIZE", 32)),
+            max_queue_per_guild=int(get_setting(config, "SCHEDULER-GUILD-QUEUE-SIZE", 8)),
+            user_rate=float(get_setting(config, "USER-RATE-PER-MINUTE", 6)) / 60,
+            user_burst=float(get_setting(config, "USER-BURST", 3)),
+            guild_rate=float(get_setting(config, "GUILD-RATE-PER-MINUTE", 30)) / 60,
+            guild_burst=float(get_setting(config, "GUILD-BURST", 10)),
+            guild_weights=config.get("GUILD-WEIGHTS"),
+        )
+
+    # -- Admission -----------------------------------------------------------
+
+    def _bucket(self, buckets: Dict[str, TokenBucket], key: str, rate: float, burst: float) -> TokenBucket:
+        bucket = buckets.get(key)
+        if bucket is None:
+            if len(buckets) >= MAX_IDLE_BUCKETS:
+                for stale in [name for name, candidate in buckets.items() if candidate.idle]:
+                    del buckets[stale]
+            bucket = buckets[key] = TokenBucket(rate, burst, self._clock)
+        return bucket
+
+    def _admit(self, guild: str, user: str) -> None:
+        if len(self._queue) >= self.max_queue:
+            self.metrics.queue_full += 1
+            raise SchedulerBusy("queue full")
+        if self._guild_depth.get(guild, 0) >= self.max_queue_per_guild:
+            self.metrics.queue_full += 1
+            raise SchedulerBusy("guild queue full")
+        user_bucket = self._bucket(self._user_buckets, user, self.user_rate, self.user_burst)
+        if not user_bucket.try_acquire():
+            self.metrics.rate_limited += 1
+            raise SchedulerBusy("user rate limited")
+        guild_bucket = self._bucket(self._guild_buckets, guild, self.guild_rate, self.guild_burst)
+        if not guild_bucket.try_acquire():
+            user_bucket.refund()
+            self.metrics.rate_limited += 1
+            raise SchedulerBusy("guild rate limited")
+
+    # -- Public API ----------------------------------------------------------
+
+    async def submit(
+        self,
+        guild_id: Optional[str],
+        user_id: str,
+        func: Callable[..., T],
+        /,
+        *args: Any,
+        coalesce_key: Optional[Hashable] = None,
+        **kwargs: Any,
+    ) -> T:
+        """Queue ``func(*args, **kwargs)`` and return its result.
+
+        Direct messages (``guild_id`` of ``None``) are scheduled as a guild of
+        their own per user. A request repeating the *coalesce_key* of its
+        user's last, still unfinished request returns that request's result.
+        """
+
+        user = str(user_id)
+        guild = str(guild_id) if guild_id is not None else f"dm:{user}"
+        leader = self._groups.get((guild, user))
+        if coalesce_key is not None and leader is not None and leader.key == coalesce_key and not leader.future.done():
+            leader.followers += 1
+            self.metrics.coalesced += 1
+            return await asyncio.shield(leader.future)
+
+        self._admit(guild, user)
+        self._ensure_workers()
+
+        weight = float(self.guild_weights.get(guild, 1.0))
+        start = max(self._virtual_time, self._last_finish.get(guild, 0.0))
+        finish = start + 1.0 / weight
+        self._last_finish[guild] = finish
+
+        future = asyncio.get_running_loop().create_future()
+        entry = _Entry(guild, user, func, args, kwargs, future, self._clock(), contextvars.copy_context(), coalesce_key)
+        self._groups[(guild, user)] = entry
+        heapq.heappush(self._queue, (finish, next(self._sequence), entry))
+        self._guild_depth[guild] = self._guild_depth.get(guild, 0) + 1
+        self.metrics.submitted += 1
+        self.metrics.queue_depth = len(self._queue)
+        self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, len(self._queue))
+        async with self._wakeup:
+            self._wakeup.notify()
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not entry.followers:
+                future.cancel()
+            raise
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Return the number of queued requests per guild."""
+
+        return {guild: depth for guild, depth in self._guild_depth.items() if depth}
+
+    async def close(self) -> None:
+        """Stop the worker tasks; queued requests are cancelled."""
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        while self._queue:
+            _, _, entry = heapq.heappop(self._queue)
+            entry.future.cancel()
+        self._groups.clear()
+        self._guild_depth.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.metrics.queue_depth = 0
+
+    # -- Workers -------------------------------------------------------------
+
+    def _ensure_workers(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Condition()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="scheduler")
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    async def _next_entry(self) -> _Entry:
+        async with self._wakeup:
+            await self._wakeup.wait_for(lambda: bool(self._queue))
+            finish, _, entry = heapq.heappop(self._queue)
+        self._virtual_time = finish
+        self._guild_depth[entry.guild] -= 1
+        self.metrics.queue_depth = len(self._queue)
+        if not self._queue:
+            self._virtual_time = 0.0
+            self._last_finish.clear()
+        return entry
+
+    async def _worker(self) -> None:
+        while True:
+            entry = await self._next_entry()
+            try:
+                if not entry.future.done():
+                    self.metrics.total_wait += self._clock() - entry.enqueued
+                    await self._run(entry)
+            finally:
+                if self._groups.get((entry.guild, entry.user)) is entry:
+                    del self._groups[(entry.guild, entry.user)]
+
+    async def _run(self, entry: _Entry) -> None:
+        try:
+            call = functools.partial(entry.func, *entry.args, **entry.kwargs)
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, entry.context.run, call)
+        except Exception as exc:  # propagated to the caller
+            self.metrics.failed += 1
+            if not entry.future.done():
+                entry.future.set_exception(exc)
+        else:
+            self.metrics.completed += 1
+            if not entry.future.done():
+                entry.future.set_result(result)
+
+__all__ = ["FairScheduler", "SchedulerBusy", "SchedulerMetrics", "TokenBucket"]
@@ -0,0 +1,151 @@
+"""Helpers for running the bot as several processes, each owning a shard range."""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import multiprocessing.connection
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+from .assets import AssetManifest, SharedAssets
+
+logger = logging.getLogger(__name__)
+
+
+def shard_for_guild(guild_id: Optional[int], shard_count: int) -> int:
+    """Return the shard Discord routes *guild_id* to.
+
+    Discord assigns guild events to ``(guild_id >> 22) % shard_count``; direct
+    messages (``None``) are always delivered to shard 0.
+    """
+
+    if shard_count <= 0:
+        raise ValueError("shard_count must be positive")
+    if guild_id is None:
+        return 0
+    return (int(guild_id) >> 22) % shard_count
+
+
+def shard_ranges(shard_count: int, processes: int) -> List[List[int]]:
+    """Split ``range(shard_count)`` into *processes* contiguous, balanced ranges."""
+
+    if shard_count <= 0 or processes <= 0:
+        raise ValueError("shard_count and processes must be positive")
+    if processes > shard_count:
+        raise ValueError("cannot run more processes than shards")
+    base, extra = divmod(shard_count, processes)
+    ranges = []
+    start = 0
+    for index in range(processes):
+        size = base + (1 if index < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+@dataclass(frozen=True)
+class ShardPlan:
+    """Assignment of shard IDs to worker processes."""
+
+    shard_count: int
+    ranges: List[List[int]]
+
+    @classmethod
+    def build(cls, shard_count: int, processes: int) -> "ShardPlan":
+        return cls(shard_count, shard_ranges(shard_count, processes))
+
+    def process_for_guild(self, guild_id: Optional[int]) -> int:
+        """Return the index of the process that owns *guild_id*'s session state."""
+
+        shard = shard_for_guild(guild_id, self.shard_count)
+        for index, shard_ids in enumerate(self.ranges):
+            if shard in shard_ids:
+                return index
+        raise LookupError(f"shard {shard} is not assigned to any process")
+
+
+def _run_shard(
+    config_path: str,
+    shard_ids: Sequence[int],
+    shard_count: int,
+    asset_manifest: Optional[AssetManifest] = None,
+) -> None:
+    from .bot import main
+    from .log import configure_logging
+
+    configure_logging()
+    logger.info("Starting shard process for shards %s of %d", list(shard_ids), shard_count)
+    main(config_path, shard_ids=list(shard_ids), shard_count=shard_count, asset_manifest=asset_manifest)
+
+
+def launch_shards(
+    config_path: str,
+    shard_count: int,
+    processes: int,
+    target: Callable[[str, Sequence[int], int, Optional[AssetManifest]], None] = _run_shard,
+    assets_root: Optional[Path] = None,
+    share_assets: bool = True,
+) -> int:
+    """Run one bot process per shard range until they exit.
+
+    Every process connects its own ``AutoShardedBot`` for its shard IDs; they
+    share conversation history through the WAL-mode SQLite database. With
+    *share_assets* the image assets are decoded once here and published as
+    :class:`~visual_novel_chat.assets.SharedAssets`, so workers map the same
+    pixels instead of each decoding its own copy.
+
+    As soon as one worker fails the others are terminated, so a supervisor
+    restarting this launcher brings the whole bot back rather than leaving
+    its shards offline. Returns the first failing worker's exit code, with a
+    worker killed by signal ``N`` counted as ``128 + N`` like a shell does,
+    or 0 if every worker exited cleanly.
+    """
+
+    plan = ShardPlan.build(shard_count, processes)
+    assets = None
+    if share_assets:
+        assets = SharedAssets.publish(assets_root or Path(__file__).resolve().parent.parent)
+    manifest = assets.manifest if assets is not None else None
+    context = multiprocessing.get_context("spawn")
+    workers = []
+    try:
+        for shard_ids in plan.ranges:
+            process = context.Process(
+                target=target,
+                args=(config_path, shard_ids, shard_count, manifest),
+                name=f"vn-shards-{shard_ids[0]}-{shard_ids[-1]}",
+            )
+            process.start()
+            logger.info("Launched %s (pid %s)", process.name, process.pid)
+            workers.append(process)
+        status = 0
+        running = {process.sentinel: process for process in workers}
+        while running:
+            for sentinel in multiprocessing.connection.wait(list(running)):
+                process = running.pop(sentinel)
+                process.join()
+                code = _exit_status(process.exitcode)
+                if code and not status:
+                    status = code
+                    logger.error("%s exited with status %d; stopping the other shards", process.name, code)
+                    for other in running.values():
+                        other.terminate()
+    finally:
+        for process in workers:
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        if assets is not None:
+            assets.close()
+    return status
+
+
+def _exit_status(exitcode: Optional[int]) -> int:
+    if exitcode is None:
+        return 1
+    return 128 - exitcode if exitcode < 0 else exitcode
+
+
+__all__ = ["ShardPlan", "launch_shards", "shard_for_guild", "shard_ranges"]
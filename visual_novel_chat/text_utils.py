@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import logging
+import re
 import textwrap
 from typing import Any, List
 
@@ -13,6 +14,28 @@ except ModuleNotFoundError:  # pragma: no cover - optional dependency
 
 logger = logging.getLogger(__name__)
 
+# Compact English stopword list used for search and keyword matching; small
+# enough to ship inline so lookups never depend on the NLTK corpora.
+STOPWORDS = frozenset(
+    """
+    about above after again all also and any are because been before being below between both but
+    can could did does doing down during each few for from further had has have having her here
+    hers herself him himself his how into its itself just like more most myself nor not now off
+    once only other our ours ourselves out over own really same she should some such than that the
+    their theirs them themselves then there these they this those through too under until very was
+    were what when where which while who whom why will with would you your yours yourself yourselves
+    """.split()
+)
+
+_TERM_PATTERN = re.compile(r"\w{3,}")
+
+
+def extract_terms(text: str) -> List[str]:
+    """Return the distinct lowercase words of *text*, skipping stopwords and short words."""
+
+    terms = (term.lower() for term in _TERM_PATTERN.findall(text))
+    return list(dict.fromkeys(term for term in terms if term not in STOPWORDS))
+
 
 def wrap_text(text: str, width: int = 30) -> str:
     """Return *text* wrapped at *width* characters per line."""
@@ -46,5 +69,4 @@ def get_text_dimensions(text: str, font: Any) -> tuple[int, int]:
         text_height = bbox[3] + descent
     else:
         text_width, text_height = 0, 0
-    logger.debug("Measured text dimensions: %dx%d", text_width, text_height)
     return text_width, text_height
@@ -0,0 +1,101 @@
+"""Streaming JSONL export and import of conversation history."""
+
+from __future__ import annotations
+
+import contextlib
+import gzip
+import io
+import json
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, Optional, Sequence
+
+from .database import EXPORT_TABLES, ConversationHistory
+
+logger = logging.getLogger(__name__)
+
+
+def parse_timestamp(value: str) -> str:
+    """Normalise an ISO date or datetime to SQLite's ``YYYY-MM-DD HH:MM:SS`` form."""
+
+    return datetime.fromisoformat(value).strftime("%Y-%m-%d %H:%M:%S")
+
+
+@contextlib.contextmanager
+def open_stream(path: str | Path, mode: str, compress: Optional[bool] = None) -> Iterator[IO[str]]:
+    """Open *path* for text reading (``"r"``) or writing (``"w"``).
+
+    ``-`` means stdin or stdout. Gzip is used when *compress* is true or,
+    if it is ``None``, when the name ends in ``.gz``.
+    """
+
+    standard = str(path) == "-"
+    if standard:
+        raw = sys.stdin.buffer if mode == "r" else sys.stdout.buffer
+    else:
+        raw = open(path, mode + "b")
+    if compress is None:
+        compress = str(path).endswith(".gz")
+    binary = gzip.GzipFile(fileobj=raw, mode=mode, compresslevel=6) if compress else raw
+    stream = io.TextIOWrapper(binary, encoding="utf-8", newline="\n")
+    try:
+        yield stream
+    finally:
+        stream.detach()
+        if compress:
+            binary.close()
+        if standard:
+            raw.flush()
+        else:
+            raw.close()
+
+
+def export_jsonl(
+    history: ConversationHistory,
+    path: str | Path,
+    tables: Sequence[str] = EXPORT_TABLES,
+    user_ids: Optional[Sequence[str]] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    compress: Optional[bool] = None,
+) -> int:
+    """Write matching messages to *path* as one JSON object per line; return the count."""
+
+    count = 0
+    with open_stream(path, "w", compress) as stream:
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+        write = stream.write
+        for row in history.export_rows(tables, user_ids, since, until):
+            write(dumps(row))
+            write("\n")
+            count += 1
+    logger.info("Exported %d rows from %s", count, history.db_path)
+    return count
+
+
+def _read_rows(stream: IO[str]) -> Iterator[Dict[str, Any]]:
+    loads = json.loads
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield loads(line)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"Invalid JSON on line {number}: {exc}") from exc
+
+
+def import_jsonl(
+    history: ConversationHistory,
+    path: str | Path,
+    batch_size: int = 50_000,
+    compress: Optional[bool] = None,
+) -> int:
+    """Append every message in the JSONL file *path*; return the count."""
+
+    with open_stream(path, "r", compress) as stream:
+        return history.import_rows(_read_rows(stream), batch_size=batch_size)
+
+
+__all__ = ["export_jsonl", "import_jsonl", "open_stream", "parse_timestamp"]
@@ -2,25 +2,61 @@
 
 from __future__ import annotations
 
+import functools
+import io
 import logging
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
 import discord
 from discord.ui import Button, View
 from PIL import Image, ImageDraw, ImageFont
 
+from .assets import SharedAssets, load_asset_images
 from .constants import CONST_POSITION
+from .encoding import EncodedFrame, FrameEncoder
+from .log import with_request_context
+from .memory import image_bytes
+from .profiling import Profiler
 from .text_utils import get_text_dimensions, paginate_text, wrap_text
 
 logger = logging.getLogger(__name__)
 
 
-class VisualNovel:
-    """Represents the current state of the visual novel overlay."""
+QUIT_MESSAGE = "Thanks for trying out the demo!"
+
 
-    def __init__(self, waifu_config: Dict[str, str], assets_root: Optional[Path] = None) -> None:
+class VisualNovel:
+    """Represents the current state of the visual novel overlay.
+
+    Button presses are acknowledged immediately and answered by editing the
+    message in place. Edits for the same message are coalesced: while one
+    upload is in flight, further presses only update the state, and a single
+    follow-up edit sends whatever the latest frame is once the upload ends.
+
+    Reduced frames, chosen per render by the load-adaptive degradation tier,
+    reuse composited scenes from a small cache instead of pasting them
+    together again and are encoded at half resolution. ``!gwen`` passes the
+    tier to :meth:`render_waifu_chat`; button renders ask *reduce_frames*.
+    """
+
+    scene_cache_size = 8
+
+    def __init__(
+        self,
+        waifu_config: Dict[str, str],
+        assets_root: Optional[Path] = None,
+        profiler: Optional[Profiler] = None,
+        encoder: Optional[FrameEncoder] = None,
+        after_callback: Optional[Callable[[], Any]] = None,
+        reduce_frames: Optional[Callable[[], bool]] = None,
+    ) -> None:
         self.waifu_config = waifu_config
+        self.profiler = profiler
+        self.after_callback = after_callback
+        self.reduce_frames = reduce_frames
+        self.encoder = encoder or FrameEncoder()
         self.prefix = "!"
         self.state = 0
         self.menu_position = 0
@@ -39,6 +75,10 @@ class VisualNovel:
         self.output_dir = self.assets_root / "output"
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.output_file = self.output_dir / "screen.jpg"
+        self.frame: Optional[EncodedFrame] = None
+        self._pending_edits: Dict[int, tuple] = {}
+        self._editing: Set[int] = set()
+        self._scenes: "OrderedDict[Tuple, Image.Image]" = OrderedDict()
 
         self.view_configs = self._build_view_configs()
         self.menu_texts = self._build_menu_texts()
@@ -52,27 +92,17 @@ class VisualNovel:
 
     # -- Setup helpers -------------------------------------------------------
 
-    def load_images(self) -> None:
-        """Load sprites, backgrounds and overlays from disk."""
-
-        def load_image(*path_parts: str) -> Image.Image:
-            return Image.open(self.assets_root.joinpath(*path_parts))
-
-        self.images["empty"] = load_image("ui_elements", "blank.png")
-        self.images["love"] = load_image("sprites", "smile.png")
-        self.images["joy"] = load_image("sprites", "delighted.png")
-        self.images["anger"] = load_image("sprites", "angry.png")
-        self.images["surprise"] = load_image("sprites", "shocked.png")
-        self.images["sadness"] = load_image("sprites", "sad.png")
-        self.images["fear"] = load_image("sprites", "shocked.png")
-        self.images["menu"] = load_image("ui_elements", "overlay_menu.png")
-        self.images["map"] = load_image("ui_elements", "overlay_map.png")
-        self.images["about"] = load_image("ui_elements", "overlay_about.png")
-        self.images["chat"] = load_image("ui_elements", "overlay_chat.png")
-        self.images["bridge"] = load_image("backgrounds", "bridge.png")
-        self.images["swing"] = load_image("backgrounds", "swing.png")
-        self.images["grove"] = load_image("backgrounds", "grove.png")
-        self.images["path"] = load_image("backgrounds", "path.png")
+    def load_images(self, assets: Optional[SharedAssets] = None) -> None:
+        """Load sprites, backgrounds and overlays.
+
+        With *assets* the images view pixels another process already decoded
+        into shared memory; otherwise they are read from disk.
+        """
+
+        if assets is not None:
+            self.images.update(assets.images())
+        else:
+            self.images.update(load_asset_images(self.assets_root))
         logger.info("Loaded %d visual novel image assets", len(self.images))
 
     def load_views(self) -> None:
@@ -87,7 +117,12 @@ class VisualNovel:
                     style=btn_conf["style"],
                     emoji=btn_conf.get("emoji"),
                 )
-                button.callback = btn_conf["callback"]
+                callback = self._acknowledged(btn_conf["callback"])
+                if self.after_callback is not None:
+                    callback = self._followed_by(callback, self.after_callback)
+                if self.profiler is not None:
+                    callback = self.profiler.wrap(callback)
+                button.callback = with_request_context(callback)
                 view.add_item(button)
             self.views.append(view)
         logger.debug("Prepared %d Discord UI view(s)", len(self.views))
@@ -101,9 +136,7 @@ class VisualNovel:
         self.waifu_chat_pages = pages
         self.current_chat_page = 0
         self.waifu_chat = pages[0]
-        logger.debug(
-            "Prepared %d chat page(s) for response length %d", len(pages), len(response_text)
-        )
+        logger.debug("Prepared %d chat page(s) for response length %d", len(pages), len(response_text))
         return pages
 
     def update_waifu_stats(self) -> None:
@@ -151,8 +184,7 @@ class VisualNovel:
             "      CHAT\n      MAP\n      ABOUT\n👉 QUIT",
         ]
 
-    def _prepare_screen(self, overlay_key: Optional[str] = None):
-        width, height = 720, 540
+    def _compose_scene(self, overlay_key: Optional[str]) -> Image.Image:
         base = self.images["empty"].copy()
         background = self.images[self.current_location]
         base.paste(background, (0, 0), background)
@@ -161,33 +193,134 @@ class VisualNovel:
         if overlay_key:
             overlay = self.images[overlay_key]
             base.paste(overlay, (0, 0), overlay)
+        return base
+
+    def _cached_scene(self, overlay_key: Optional[str]) -> Image.Image:
+        key = (self.current_location, self.waifu_mood, tuple(self.waifu_position), overlay_key)
+        scene = self._scenes.get(key)
+        if scene is None:
+            scene = self._scenes[key] = self._compose_scene(overlay_key)
+            while len(self._scenes) > self.scene_cache_size:
+                self._scenes.popitem(last=False)
+        else:
+            self._scenes.move_to_end(key)
+        return scene.copy()
+
+    def _button_frame_reduced(self) -> bool:
+        return self.reduce_frames is not None and self.reduce_frames()
+
+    def _prepare_screen(self, overlay_key: Optional[str] = None, reduced: bool = False):
+        width, height = 720, 540
+        base = self._cached_scene(overlay_key) if reduced else self._compose_scene(overlay_key)
         draw = ImageDraw.Draw(base)
         font = ImageFont.truetype(str(self.assets_root / "fonts" / "OpenSansEmoji.ttf"), 30, encoding="unic")
         text_width, _ = get_text_dimensions(self.waifu_stats, font)
         draw.text(((width - text_width) / 2, 18), self.waifu_stats, (255, 255, 255), font=font)
-        logger.debug("Prepared screen with overlay '%s'", overlay_key)
         return base, draw, font, width
 
+    def _save_frame(self, base: Image.Image, screen: str, reduced: bool = False) -> None:
+        if reduced:
+            # Half-size frames fit the budget at a higher quality; keep their
+            # remembered quality apart from the full-size one.
+            base, screen = base.reduce(2), f"{screen}:reduced"
+        self.frame = self.encoder.encode(base, screen, self.output_dir / "screen")
+        self.output_file = self.frame.path
+
+    def session_bytes(self) -> int:
+        """Approximate memory held by per-session state (last frame and chat text)."""
+
+        frame = len(self.frame.data) if self.frame is not None else 0
+        return frame + len(self.waifu_chat_full) + sum(map(len, self.waifu_chat_pages))
+
+    def scene_cache_bytes(self) -> int:
+        return image_bytes(self._scenes.values())
+
+    def evict_scenes(self, nbytes: int) -> int:
+        """Drop cached scenes, oldest first, until *nbytes* are freed."""
+
+        freed = 0
+        while self._scenes and freed < nbytes:
+            _, scene = self._scenes.popitem(last=False)
+            freed += image_bytes([scene])
+        return freed
+
+    def frame_file(self) -> discord.File:
+        """Return the most recently rendered frame as an upload."""
+
+        if self.frame is None:
+            return discord.File(str(self.output_file))
+        return discord.File(io.BytesIO(self.frame.data), filename=self.frame.path.name)
+
+    # -- Interaction responses -----------------------------------------------
+
+    @staticmethod
+    def _acknowledged(callback: Callable[[Any], Awaitable[None]]) -> Callable[[Any], Awaitable[None]]:
+        """Defer the interaction before running *callback* so it never times out."""
+
+        @functools.wraps(callback)
+        async def wrapper(interaction) -> None:
+            if not interaction.response.is_done():
+                await interaction.response.defer()
+            await callback(interaction)
+
+        return wrapper
+
+    @staticmethod
+    def _followed_by(callback: Callable[[Any], Awaitable[None]], hook: Callable[[], Any]) -> Callable[[Any], Awaitable[None]]:
+        """Run *hook* after *callback*, even when it fails."""
+
+        @functools.wraps(callback)
+        async def wrapper(interaction) -> None:
+            try:
+                await callback(interaction)
+            finally:
+                hook()
+
+        return wrapper
+
+    async def _queue_edit(self, interaction, build_edit: Callable[[], Dict[str, Any]]) -> None:
+        """Edit *interaction*'s message, coalescing with edits already in flight.
+
+        *build_edit* is evaluated only when the edit is sent, so a burst of
+        presses results in at most one edit beyond the one in progress.
+        """
+
+        if not interaction.response.is_done():
+            await interaction.response.defer()
+        message_id = interaction.message.id
+        self._pending_edits[message_id] = (interaction, build_edit)
+        if message_id in self._editing:
+            logger.debug("Coalescing edit for message %s", message_id)
+            return
+        self._editing.add(message_id)
+        try:
+            while message_id in self._pending_edits:
+                latest, build = self._pending_edits.pop(message_id)
+                await latest.edit_original_response(**build())
+        finally:
+            self._editing.discard(message_id)
+
     async def _update_interaction(self, interaction) -> None:
         logger.debug("Updating Discord interaction for state %d", self.state)
-        await interaction.message.delete()
-        await interaction.message.channel.send(
-            file=discord.File(str(self.output_file)),
-            view=self.views[self.state],
+        await self._queue_edit(
+            interaction,
+            lambda: {"attachments": [self.frame_file()], "view": self.views[self.state]},
         )
 
     async def render_menu(self, interaction) -> None:
         self.last_interaction = interaction
-        base, draw, font, width = self._prepare_screen("menu")
+        reduced = self._button_frame_reduced()
+        base, draw, font, width = self._prepare_screen("menu", reduced)
         draw.text((27, 91), self.menu_texts[self.menu_position], (255, 255, 255), font=font)
-        base.convert("RGB").save(self.output_file)
+        self._save_frame(base, "menu", reduced)
         await self._update_interaction(interaction)
         logger.info("Rendered menu at position %d", self.menu_position)
 
     async def render_chat(self, interaction) -> None:
         self.last_interaction = interaction
         text_box_center = 416
-        base, draw, font, width = self._prepare_screen("chat")
+        reduced = self._button_frame_reduced()
+        base, draw, font, width = self._prepare_screen("chat", reduced)
         bbox = draw.textbbox((0, 0), self.waifu_chat, font=font)
         if bbox:
             text_width = bbox[2] - bbox[0]
@@ -195,13 +328,13 @@ class VisualNovel:
         else:
             text_width = text_height = 0
         draw.text(((width - text_width) / 2, text_box_center - (text_height / 2)), self.waifu_chat, (255, 255, 255), font=font)
-        base.convert("RGB").save(self.output_file)
+        self._save_frame(base, "chat", reduced)
         await self._update_interaction(interaction)
         logger.info("Rendered chat screen for page %d", self.current_chat_page + 1)
 
-    async def render_waifu_chat(self) -> None:
+    async def render_waifu_chat(self, reduced: bool = False) -> None:
         text_box_center = 416
-        base, draw, font, width = self._prepare_screen("chat")
+        base, draw, font, width = self._prepare_screen("chat", reduced)
         bbox = draw.textbbox((0, 0), self.waifu_chat, font=font)
         if bbox:
             text_width = bbox[2] - bbox[0]
@@ -212,32 +345,36 @@ class VisualNovel:
         if len(self.waifu_chat_pages) > 1:
             page_indicator = f"Page {self.current_chat_page + 1}/{len(self.waifu_chat_pages)}"
             draw.text((width - 150, text_box_center + (text_height / 2) + 10), page_indicator, (255, 255, 255), font=font)
-        base.convert("RGB").save(self.output_file)
+        self._save_frame(base, "chat", reduced)
         logger.debug("Rendered waifu chat page %d", self.current_chat_page + 1)
 
     async def render_about(self, interaction) -> None:
         self.state = 3
-        base, _, _, _ = self._prepare_screen("about")
-        base.convert("RGB").save(self.output_file)
+        reduced = self._button_frame_reduced()
+        base, _, _, _ = self._prepare_screen("about", reduced)
+        self._save_frame(base, "about", reduced)
         await self._update_interaction(interaction)
         logger.info("Rendered about screen")
 
     async def render_map(self, interaction) -> None:
         self.last_interaction = interaction
         self.state = 2
-        base, _, _, _ = self._prepare_screen("map")
-        base.convert("RGB").save(self.output_file)
+        reduced = self._button_frame_reduced()
+        base, _, _, _ = self._prepare_screen("map", reduced)
+        self._save_frame(base, "map", reduced)
         await self._update_interaction(interaction)
         logger.info("Rendered map screen at location %s", self.current_location)
 
     async def render_quit(self, interaction) -> None:
         logger.info("Rendering quit confirmation message")
-        await interaction.message.delete()
-        await interaction.message.channel.send("Thanks for trying out the demo!")
+        await self._queue_edit(
+            interaction,
+            lambda: {"content": QUIT_MESSAGE, "attachments": [], "view": None},
+        )
 
     async def start(self) -> None:
         base, _, _, _ = self._prepare_screen("chat")
-        base.convert("RGB").save(self.output_file)
+        self._save_frame(base, "chat")
         logger.debug("Initial screen prepared at start")
 
     # -- Button callbacks ----------------------------------------------------
@@ -306,7 +443,7 @@ class VisualNovel:
             self.current_chat_page -= 1
             self.waifu_chat = self.waifu_chat_pages[self.current_chat_page]
             await self.render_waifu_chat()
-        await self._update_interaction(interaction)
+            await self._update_interaction(interaction)
         logger.debug("Chat page moved up to %d", self.current_chat_page)
 
     async def button_chat_down_callback(self, interaction) -> None:
@@ -314,5 +451,5 @@ class VisualNovel:
             self.current_chat_page += 1
             self.waifu_chat = self.waifu_chat_pages[self.current_chat_page]
             await self.render_waifu_chat()
-        await self._update_interaction(interaction)
+            await self._update_interaction(interaction)
         logger.debug("Chat page moved down to %d", self.current_chat_page)